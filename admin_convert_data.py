@@ -1,8 +1,11 @@
+import argparse
 import asyncio
 import csv
 import json
+from itertools import islice
 
 from service.schemas import QuestionAddResponse, QuestionListRequest
+from telegram_service.http_client import http_client
 from telegram_service.process import (
     CallHandlersAdminFunc,
     CallHandlersQuizBulk,
@@ -51,15 +54,39 @@ def get_question_answers_from_csv():
             yield question_dict, answers
 
 
-async def questions_from_csv_to_db():
-    for question_dict, answers in get_question_answers_from_csv():
-        question_add = await CallHandlersAdminFunc().add_question(
-            question_dict
-        )
-        if question_add and question_add.created:
-            question_id = question_add.created
-            for i, ans in enumerate(answers):
-                await answer_to_db(question_id, text=ans, correct=(i == 0))
+def batches(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+async def questions_from_csv_to_db(batch_size: int = 500):
+    """One /v1/questions:bulk request per `batch_size` questions"""
+    admin = CallHandlersAdminFunc()
+    for batch in batches(get_question_answers_from_csv(), batch_size):
+        questions = [
+            {
+                **question_dict,
+                "answers": [
+                    {"text": ans, "correct": i == 0}
+                    for i, ans in enumerate(answers)
+                ],
+            }
+            for question_dict, answers in batch
+        ]
+        res = await admin.add_questions_bulk(questions)
+        if res is None:
+            continue
+        for item in res.items:
+            if item.error:
+                print(
+                    f"skipped {batch[item.index][0]['text']!r}: {item.error}"
+                )
+
+
+async def run_import(batch_size: int):
+    async with http_client:
+        await questions_from_csv_to_db(batch_size)
 
 
 """
@@ -78,4 +105,7 @@ async def answers_from_csv_to_db():
 
 
 if __name__ == "__main__":
-    asyncio.run(questions_from_csv_to_db())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run_import(args.batch_size))
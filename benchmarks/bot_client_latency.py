@@ -0,0 +1,74 @@
+"""Per-update latency: a new aiohttp session per call vs the shared client.
+
+An update of the bot makes a few sequential calls (answer the round,
+reply, send the next question), each is a GET of `--url` here:
+    python -m benchmarks.bot_client_latency --updates 200 --calls 3
+    python -m benchmarks.bot_client_latency --url https://api.telegram.org
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import aiohttp
+
+from telegram_service.http_client import http_client
+from telegram_service.tg_config import URL_START
+
+TG_ID = 100500
+
+
+async def fresh_session_get(url: str) -> None:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as resp:
+            await resp.read()
+
+
+async def shared_client_get(url: str) -> None:
+    async with http_client.session.get(url) as resp:
+        await resp.read()
+
+
+async def timed_updates(get, url: str, updates: int, calls: int) -> list:
+    latencies = []
+    for _ in range(updates):
+        started = time.perf_counter()
+        for _ in range(calls):
+            await get(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summary(latencies: list[float]) -> str:
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    return "avg {:>8.2f}  p50 {:>8.2f}  p95 {:>8.2f}".format(
+        statistics.fmean(latencies), statistics.median(latencies), p95
+    )
+
+
+async def run(url: str | None, updates: int, calls: int):
+    async with http_client:
+        if url is None:
+            add_player = URL_START + "/v1/add-player?tg_id={}".format(TG_ID)
+            async with http_client.session.post(add_player) as resp:
+                await resp.read()
+            url = URL_START + "/v1/player-score?tg_id={}".format(TG_ID)
+        print(f"{updates} updates x {calls} calls of {url}, ms per update")
+        fresh = await timed_updates(fresh_session_get, url, updates, calls)
+        print(f"{'session per call':>17}: {summary(fresh)}")
+        shared = await timed_updates(shared_client_get, url, updates, calls)
+        print(f"{'shared client':>17}: {summary(shared)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.updates, args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Leaderboard latency with 1M players.
+
+Seeds players inside a transaction (rolled back at the end) and times
+top-N, neighbours and rank by COUNT(*) vs the in-memory ScoreTree:
+    python -m benchmarks.leaderboard --players 1000000
+"""
+
+import argparse
+import asyncio
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from service.db_setup.db_settings import DBManager
+from service.db_watchers import GameDb
+from service.leaderboard import ScoreTree
+
+TG_BASE = 10**12
+SEED = sa.text(
+    """INSERT INTO players (tg_id, score)
+    SELECT :tg_base + g, (random() * random() * 5000)::int
+    FROM generate_series(1, :players) g"""
+)
+
+
+async def timed(call, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await call()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def run(players: int, repeat: int):
+    db_manager = DBManager()
+    engine = db_manager.get_engine()
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        await conn.execute(SEED, {"tg_base": TG_BASE, "players": players})
+        await conn.execute(sa.text("ANALYZE players"))
+        session = AsyncSession(
+            bind=conn, join_transaction_mode="create_savepoint"
+        )
+        game = GameDb(session)
+        tg_id = TG_BASE + players // 2
+        score = await game.get_score_of_player(tg_id)
+
+        started = time.perf_counter()
+        tree = ScoreTree.from_counts(await game.score_counts())
+        load_ms = (time.perf_counter() - started) * 1000
+
+        results = {
+            "top 10": await timed(lambda: game.top_players(10), repeat),
+            "around 5": await timed(
+                lambda: game.players_around(tg_id, score, 5), repeat
+            ),
+            "rank COUNT(*)": await timed(
+                lambda: game.count_players_above(score), repeat
+            ),
+        }
+        started = time.perf_counter()
+        for _ in range(repeat):
+            tree.rank(score)
+        results["rank ScoreTree"] = (
+            (time.perf_counter() - started) / repeat * 1000
+        )
+        results["ScoreTree load"] = load_ms
+
+        print(f"players={players} (tg_id {tg_id}: score {score})")
+        for name, elapsed in results.items():
+            print(f"{name:>16} {elapsed:>10.3f} ms")
+        await session.close()
+        await trans.rollback()
+    await db_manager.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.players, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
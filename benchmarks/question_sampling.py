@@ -0,0 +1,73 @@
+"""Random question sampling: ORDER BY random() vs index probing.
+
+Grows the question bank inside a transaction (rolled back at the end)
+and times both queries at each size:
+    python -m benchmarks.question_sampling --sizes 1000 100000 1000000
+"""
+
+import argparse
+import asyncio
+import time
+
+import sqlalchemy as sa
+
+from service.db_setup.db_settings import DBManager
+from service.db_setup.models import Question
+from service.db_watchers import GameDb
+
+SEED = sa.text(
+    """INSERT INTO questions (text, active)
+    SELECT 'bench question ' || g, (g % 10 <> 0)::int
+    FROM generate_series(1, :amount) g"""
+)
+
+
+def order_by_random(amount: int):
+    return sa.select(Question.id).order_by(sa.func.random()).limit(amount)
+
+
+async def timed(conn, query, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        (await conn.execute(query)).all()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+async def run(sizes: list[int], amount: int, repeat: int):
+    db_manager = DBManager()
+    engine = db_manager.get_engine()
+    probing = GameDb(None).random_questions_query(amount)
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        bank = (
+            await conn.execute(sa.select(sa.func.count(Question.id)))
+        ).scalar()
+        print(f"{'questions':>10} {'random() ms':>12} {'probing ms':>12}")
+        for size in sorted(sizes):
+            if size > bank:
+                await conn.execute(SEED, {"amount": size - bank})
+                await conn.execute(sa.text("ANALYZE questions"))
+                bank = size
+            old = await timed(conn, order_by_random(amount), repeat)
+            new = await timed(conn, probing, repeat)
+            print(f"{bank:>10} {old:>12.2f} {new:>12.2f}")
+        await trans.rollback()
+    await db_manager.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000, 1_000_000],
+    )
+    parser.add_argument("--amount", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.amount, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Requests/sec on /v1/round-question-id against a running service.
+
+Run it once on the old build and once on the new one, e.g.:
+    python -m benchmarks.round_question_rps --concurrency 20 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from telegram_service.tg_config import URL_START
+
+TG_ID = 100500
+
+
+async def worker(
+    session: aiohttp.ClientSession, url: str, deadline: float, stats: dict
+):
+    data = json.dumps({"tg_id": TG_ID})
+    headers = {"Content-Type": "application/json"}
+    while time.perf_counter() < deadline:
+        async with session.post(url, data=data, headers=headers) as resp:
+            await resp.read()
+            key = "ok" if resp.status == 200 else "errors"
+            stats[key] += 1
+
+
+async def run(concurrency: int, seconds: float) -> dict:
+    stats = {"ok": 0, "errors": 0}
+    async with aiohttp.ClientSession() as session:
+        add_player = URL_START + "/v1/add-player?tg_id={}".format(TG_ID)
+        async with session.post(add_player) as resp:
+            await resp.read()
+
+        url = URL_START + "/v1/round-question-id"
+        started = time.perf_counter()
+        deadline = started + seconds
+        await asyncio.gather(
+            *(
+                worker(session, url, deadline, stats)
+                for _ in range(concurrency)
+            )
+        )
+        stats["elapsed"] = time.perf_counter() - started
+    stats["rps"] = stats["ok"] / stats["elapsed"]
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    stats = asyncio.run(run(args.concurrency, args.seconds))
+    print(
+        "ok={ok} errors={errors} elapsed={elapsed:.2f}s rps={rps:.1f}".format(
+            **stats
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Fake Telegram: POSTs updates to the webhook of the bot at a high rate.
+
+Updates are read from a file of recorded ones (one json per line) or
+made up for `--chats` chats, e.g. against `python tg_main.py --webhook`:
+    python -m benchmarks.webhook_fake_sender --updates 10000 --concurrency 50
+    python -m benchmarks.webhook_fake_sender --recorded updates.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+
+import aiohttp
+
+from telegram_service.fake_updates import sample_updates
+from telegram_service.tg_config import TG_WEBHOOK_PORT, TG_WEBHOOK_SECRET
+from telegram_service.webhook import SECRET_HEADER, WEBHOOK_PATH
+
+
+def recorded_updates(path: str) -> list:
+    with open(path, encoding="utf8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+async def sender(session, url, queue, secret, statuses, latencies):
+    headers = {SECRET_HEADER: secret}
+    while True:
+        try:
+            update = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        started = time.perf_counter()
+        async with session.post(url, json=update, headers=headers) as resp:
+            await resp.read()
+            statuses[resp.status] += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def run(url: str, updates: list, concurrency: int, secret: str):
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+    statuses, latencies = Counter(), []
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(
+            *(
+                sender(session, url, queue, secret, statuses, latencies)
+                for _ in range(concurrency)
+            )
+        )
+    elapsed = time.perf_counter() - started
+    print(
+        f"{len(latencies)} updates in {elapsed:.2f}s,"
+        f" {len(latencies) / elapsed:.0f}/s, statuses {dict(statuses)}"
+    )
+    print(
+        "latency ms p50 {:.2f} p95 {:.2f}".format(
+            statistics.median(latencies),
+            statistics.quantiles(latencies, n=20)[-1],
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--url", default=f"http://localhost:{TG_WEBHOOK_PORT}{WEBHOOK_PATH}"
+    )
+    parser.add_argument("--recorded", default=None)
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--chats", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--secret", default=TG_WEBHOOK_SECRET)
+    args = parser.parse_args()
+    updates = (
+        recorded_updates(args.recorded)
+        if args.recorded
+        else sample_updates(args.chats, args.updates)
+    )
+    asyncio.run(run(args.url, updates, args.concurrency, args.secret))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""schedules
+
+Revision ID: 1a6d3f8e9b25
+Revises: e71b5a9c04d2
+Create Date: 2026-10-18 13:31:52.664018
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '1a6d3f8e9b25'
+down_revision: Union[str, None] = 'e71b5a9c04d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'schedules',
+        sa.Column('player_id', sa.BigInteger(), nullable=False),
+        sa.Column('question_id', sa.Integer(), nullable=False),
+        sa.Column('due', sa.DateTime(timezone=True),
+                  server_default=sa.text("TIMEZONE('utc', now())"),
+                  nullable=False),
+        sa.Column('ease', sa.Float(), server_default='2.5', nullable=False),
+        sa.Column('streak', sa.Integer(), server_default='0',
+                  nullable=False),
+        sa.Column('interval_s', sa.Integer(), server_default='0',
+                  nullable=False),
+        sa.ForeignKeyConstraint(['player_id'], ['players.tg_id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['question_id'], ['questions.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('player_id', 'question_id'),
+    )
+    op.create_index('ix_schedules_player_id_due', 'schedules',
+                    ['player_id', 'due'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_schedules_player_id_due', table_name='schedules')
+    op.drop_table('schedules')
@@ -0,0 +1,47 @@
+"""hot lookup indexes
+
+Revision ID: 5b7c2e9a41f3
+Revises: 0408ec7df0da
+Create Date: 2026-10-18 09:12:31.204817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7c2e9a41f3'
+down_revision: Union[str, None] = '0408ec7df0da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    # GameDb.get_next_question_id, mark_question_answered
+    ('ix_rounds_player_id_asked', 'rounds', ['player_id', 'asked']),
+    # QuestionDb.find_correct_answers, AnswerDb.get_answers_for_question
+    ('ix_answers_question_id_correct', 'answers', ['question_id', 'correct']),
+    # QuestionDb.get_questions ordered by id / updated_dt
+    ('ix_questions_active_id', 'questions', ['active', 'id']),
+    ('ix_questions_active_updated_dt', 'questions',
+     ['active', 'updated_dt', 'id']),
+)
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in INDEXES:
+            op.drop_index(
+                name, table_name=table,
+                postgresql_concurrently=True, if_exists=True,
+            )
@@ -0,0 +1,33 @@
+"""answered chunks
+
+Revision ID: 7f2c4b1e8d93
+Revises: 1a6d3f8e9b25
+Create Date: 2026-10-18 14:52:40.118273
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7f2c4b1e8d93'
+down_revision: Union[str, None] = '1a6d3f8e9b25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'answered_chunks',
+        sa.Column('player_id', sa.BigInteger(), nullable=False),
+        sa.Column('chunk_no', sa.Integer(), nullable=False),
+        sa.Column('bits', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['player_id'], ['players.tg_id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('player_id', 'chunk_no'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('answered_chunks')
@@ -0,0 +1,43 @@
+"""question text search
+
+Revision ID: 9e4d1c7a2b60
+Revises: 5b7c2e9a41f3
+Create Date: 2026-10-18 10:03:47.518230
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4d1c7a2b60'
+down_revision: Union[str, None] = '5b7c2e9a41f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # stored generated column, kept up to date by postgres on every write
+    op.add_column('questions', sa.Column(
+        'text_tsv', postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', coalesce(text, ''))",
+                    persisted=True),
+        nullable=True,
+    ))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_questions_text_tsv', 'questions', ['text_tsv'],
+            postgresql_using='gin',
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_questions_text_tsv', table_name='questions',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.drop_column('questions', 'text_tsv')
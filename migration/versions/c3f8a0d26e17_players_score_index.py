@@ -0,0 +1,35 @@
+"""players score index
+
+Revision ID: c3f8a0d26e17
+Revises: 9e4d1c7a2b60
+Create Date: 2026-10-18 11:40:12.903114
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f8a0d26e17'
+down_revision: Union[str, None] = '9e4d1c7a2b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # leaderboard top-N and neighbours of a player
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_players_score_tg_id', 'players',
+            [sa.text('score DESC'), 'tg_id'],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_players_score_tg_id', table_name='players',
+            postgresql_concurrently=True, if_exists=True,
+        )
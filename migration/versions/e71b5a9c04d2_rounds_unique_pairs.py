@@ -0,0 +1,52 @@
+"""rounds unique pairs
+
+Revision ID: e71b5a9c04d2
+Revises: c3f8a0d26e17
+Create Date: 2026-10-18 12:25:09.417350
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e71b5a9c04d2'
+down_revision: Union[str, None] = 'c3f8a0d26e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # keep the first round of every (player, question)
+    op.execute(
+        'DELETE FROM rounds r USING rounds d '
+        'WHERE r.player_id = d.player_id '
+        'AND r.question_id = d.question_id AND r.id > d.id'
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_rounds_player_id_question_id', 'rounds',
+            ['player_id', 'question_id'], unique=True,
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+        op.create_index(
+            'ix_rounds_asked_id', 'rounds', ['id'],
+            postgresql_where=sa.text('asked'),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+    op.execute(
+        'ALTER TABLE rounds ADD CONSTRAINT uq_rounds_player_id_question_id '
+        'UNIQUE USING INDEX uq_rounds_player_id_question_id'
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        'uq_rounds_player_id_question_id', 'rounds', type_='unique'
+    )
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_rounds_asked_id', table_name='rounds',
+            postgresql_concurrently=True, if_exists=True,
+        )
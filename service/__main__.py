@@ -1,13 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 import uvicorn
 from fastapi import FastAPI
 
+from service.answer_key import load_answer_keys
+from service.catalog_listener import (
+    SUBSCRIBE_TIMEOUT,
+    listen_question_changes,
+)
+from service.db_setup.db_settings import db_manager
+from service.db_watchers import QueryTypeDb
+from service.deck_builder import refill_decks_forever
 from service.endpoints.data_handlers import api_router as data_routes
 from service.endpoints.game_handlers import api_router as game_routes
+from service.endpoints.stats_handlers import api_router as stats_routes
 from service.endpoints.tg_handlers import api_router as tg_routes
+from service.leaderboard import refresh_leaderboard
+from service.maintenance import prune_rounds_forever
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """One engine (and its connection pool) per process.
+
+    Plus background tasks: a LISTEN connection which evicts questions
+    changed by other workers from the catalog, leaderboard reloads,
+    pruning of asked rounds, refilling of decks.
+    Answer keys for grading are loaded before the first request, on
+    postgresql by the listener once it is subscribed.
+    """
+    db_manager.get_engine()
+    tasks = [
+        asyncio.create_task(refresh_leaderboard()),
+        asyncio.create_task(prune_rounds_forever()),
+        asyncio.create_task(refill_decks_forever()),
+    ]
+    if QueryTypeDb.DBTYPE == "postgresql":
+        subscribed = asyncio.Event()
+        tasks.append(asyncio.create_task(listen_question_changes(subscribed)))
+        with suppress(TimeoutError):
+            await asyncio.wait_for(subscribed.wait(), SUBSCRIBE_TIMEOUT)
+    else:
+        await load_answer_keys()
+    yield
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    await db_manager.dispose()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
-list_of_routes = [data_routes, tg_routes, game_routes]
+list_of_routes = [data_routes, tg_routes, game_routes, stats_routes]
 for route in list_of_routes:
     app.include_router(route)  # , prefix=setting.PATH_PREFIX
 
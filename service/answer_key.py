@@ -0,0 +1,144 @@
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from service.config import logger
+from service.db_setup.db_settings import REPLICA_SESSION, db_manager
+from service.db_watchers import AnswerDb
+
+PENDING_KEY_INVALIDATIONS = "answer_key_invalidate"
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """Correct answers of a question"""
+
+    correct: frozenset[int]
+    texts: tuple[tuple[int, str], ...]  # (answer id, text)
+
+    def grade(self, answer_ids: list[int]) -> bool:
+        """O(k): exactly the correct answers, each once"""
+        chosen = set(answer_ids)
+        return len(chosen) == len(answer_ids) and chosen == self.correct
+
+
+def build_keys(rows) -> dict[int, AnswerKey]:
+    """From (question_id, answer id, text) rows of correct answers"""
+    texts: dict[int, list[tuple[int, str]]] = {}
+    for question_id, answer_id, text in rows:
+        texts.setdefault(question_id, []).append((answer_id, text))
+    return {
+        question_id: AnswerKey(
+            correct=frozenset(id_ for id_, _ in answers),
+            texts=tuple(answers),
+        )
+        for question_id, answers in texts.items()
+    }
+
+
+class AnswerKeyIndex:
+    """question_id -> AnswerKey of every question, loaded at startup.
+
+    Kept like the catalog: answer changes drop the key now and after
+    their transaction commits, the next grading of it reloads it. Keys
+    read before the last invalidation of their question, or read from a
+    replica, aren't kept.
+    """
+
+    def __init__(self):
+        self.keys: dict[int, AnswerKey] = {}
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self._generation = 0
+        self._invalidated_at: dict[int, int] = {}  # question_id -> gen
+        self._cleared_at = 0
+
+    def generation(self) -> int:
+        """Take it before reading keys from the db, for `put` and `load`"""
+        return self._generation
+
+    def _stale(self, question_id: int, since: int) -> bool:
+        return (
+            self._cleared_at > since
+            or self._invalidated_at.get(question_id, 0) > since
+        )
+
+    def load(self, keys: dict[int, AnswerKey], since: int) -> None:
+        self.keys = {
+            question_id: key
+            for question_id, key in keys.items()
+            if not self._stale(question_id, since)
+        }
+        self.loaded = True
+
+    def get(self, question_id: int) -> AnswerKey | None:
+        key = self.keys.get(question_id)
+        if key is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return key
+
+    def put(
+        self, question_id: int, key: AnswerKey, since: int, session=None
+    ) -> None:
+        """Keep `key` read at generation `since` in `session`"""
+        if session is not None and session.info.get(REPLICA_SESSION):
+            return
+        if self._stale(question_id, since):
+            return  # changed while it was read
+        self.keys[question_id] = key
+
+    def invalidate(self, question_id: int) -> None:
+        self._generation += 1
+        self._invalidated_at[question_id] = self._generation
+        self.keys.pop(question_id, None)
+
+    def invalidate_on_commit(self, session, question_id: int) -> None:
+        self.invalidate(question_id)
+        session.info.setdefault(PENDING_KEY_INVALIDATIONS, set()).add(
+            question_id
+        )
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._cleared_at = self._generation
+        self.keys.clear()
+        self.loaded = False
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.keys),
+            "loaded": self.loaded,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+answer_keys = AnswerKeyIndex()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for question_id in session.info.pop(PENDING_KEY_INVALIDATIONS, ()):
+        answer_keys.invalidate(question_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(PENDING_KEY_INVALIDATIONS, None)
+
+
+async def load_answer_keys() -> None:
+    """All keys, from the primary: a lagging replica would give old ones"""
+    since = answer_keys.generation()
+    try:
+        session_maker = db_manager.session_maker
+        async with session_maker() as session:
+            rows = await AnswerDb(session).correct_answer_rows()
+        answer_keys.load(build_keys(rows), since)
+    except (OSError, SQLAlchemyError) as exc:
+        logger.warning("answer keys not loaded: %s", exc)
@@ -0,0 +1,41 @@
+# question ids per bitmap row, 1 KiB of bits
+ANSWERED_CHUNK_BITS = 8192
+ANSWERED_CHUNK_BYTES = ANSWERED_CHUNK_BITS // 8
+
+
+def locate(question_id: int) -> tuple[int, int]:
+    """(chunk_no, bit) of a question id"""
+    return divmod(question_id, ANSWERED_CHUNK_BITS)
+
+
+class AnsweredBitmap:
+    """Answered question ids of a player, from answered_chunks rows.
+
+    Bits are numbered like postgres get_bit(): from the lowest bit of
+    each byte.
+    """
+
+    def __init__(self, chunks: dict[int, bytes] | None = None):
+        self.chunks = chunks or {}
+
+    def __contains__(self, question_id: int) -> bool:
+        chunk_no, bit = locate(question_id)
+        bits = self.chunks.get(chunk_no)
+        if bits is None or bit // 8 >= len(bits):
+            return False
+        return bool(bits[bit // 8] >> (bit % 8) & 1)
+
+    def __len__(self) -> int:
+        return sum(
+            bin(byte).count("1")
+            for bits in self.chunks.values()
+            for byte in bits
+        )
+
+    def add(self, question_id: int) -> None:
+        chunk_no, bit = locate(question_id)
+        bits = bytearray(
+            self.chunks.get(chunk_no, bytes(ANSWERED_CHUNK_BYTES))
+        )
+        bits[bit // 8] |= 1 << (bit % 8)
+        self.chunks[chunk_no] = bytes(bits)
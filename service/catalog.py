@@ -0,0 +1,104 @@
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from service.config import CATALOG_SIZE
+from service.db_setup.db_settings import REPLICA_SESSION
+from service.db_setup.schemas import QuestionDto
+
+PENDING_INVALIDATIONS = "catalog_invalidate"
+
+
+class QuestionCatalog:
+    """LRU of active questions with their answers, kept in the process.
+
+    Mutations of questions and answers invalidate entries right away and
+    once more after their transaction commits. Every invalidation bumps
+    a generation, a read passes the one it started at to `put`, so a
+    read running in between can't put the old version back. Reads of
+    replicas, which may lag, aren't put at all.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: OrderedDict[int, QuestionDto] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._generation = 0
+        self._invalidated_at: dict[int, int] = {}  # question_id -> gen
+        self._cleared_at = 0
+
+    def generation(self) -> int:
+        """Take it before reading a question from the db, for `put`"""
+        return self._generation
+
+    def get(self, question_id: int) -> QuestionDto | None:
+        question = self._items.get(question_id)
+        if question is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(question_id)
+        self.hits += 1
+        return question
+
+    def put(self, question: QuestionDto, since: int, session=None) -> None:
+        """Cache `question` read at generation `since` in `session`"""
+        if self.max_size <= 0 or not question.active:
+            return
+        if session is not None and session.info.get(REPLICA_SESSION):
+            return
+        if (
+            self._cleared_at > since
+            or self._invalidated_at.get(question.id, 0) > since
+        ):
+            return  # changed while it was read
+        self._items[question.id] = question
+        self._items.move_to_end(question.id)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, question_id: int) -> None:
+        self._generation += 1
+        self._invalidated_at[question_id] = self._generation
+        if self._items.pop(question_id, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_on_commit(self, session, question_id: int) -> None:
+        """Drop the entry now and after `session` commits"""
+        self.invalidate(question_id)
+        session.info.setdefault(PENDING_INVALIDATIONS, set()).add(question_id)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._cleared_at = self._generation
+        self._items.clear()
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / requests, 4) if requests else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+catalog = QuestionCatalog(CATALOG_SIZE)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for question_id in session.info.pop(PENDING_INVALIDATIONS, ()):
+        catalog.invalidate(question_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(PENDING_INVALIDATIONS, None)
@@ -0,0 +1,62 @@
+import asyncio
+
+import asyncpg
+
+from service.answer_key import answer_keys, load_answer_keys
+from service.catalog import catalog
+from service.config import logger
+from service.db_setup.db_settings import connect_string
+from service.db_watchers import QUESTION_CHANGED_CHANNEL
+
+RECONNECT_DELAYS = (1, 2, 5, 10, 30)
+SUBSCRIBE_TIMEOUT = 5  # the app waits this long for the first LISTEN, s
+
+
+def on_question_changed(_conn, _pid, _channel, payload: str) -> None:
+    """Listener callback of asyncpg, payload is the question id"""
+    try:
+        question_id = int(payload)
+    except ValueError:
+        logger.warning("bad %s payload: %r", QUESTION_CHANGED_CHANNEL, payload)
+        return
+    catalog.invalidate(question_id)
+    answer_keys.invalidate(question_id)
+
+
+async def listen_question_changes(
+    subscribed: asyncio.Event | None = None,
+) -> None:
+    """Keep the catalog of this worker in sync with the other workers.
+
+    Notifications sent while disconnected are lost, so the catalog
+    and the answer keys are cleared when the connection is lost.
+    The answer keys are loaded once LISTEN is on, so no change slips
+    in between, then `subscribed` is set.
+    """
+    attempt = 0
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect("postgresql://" + connect_string())
+            await conn.add_listener(
+                QUESTION_CHANGED_CHANNEL, on_question_changed
+            )
+            catalog.clear()
+            await load_answer_keys()
+            if subscribed is not None:
+                subscribed.set()
+            attempt = 0
+            closed = asyncio.Event()
+            conn.add_termination_listener(lambda _conn, ev=closed: ev.set())
+            await closed.wait()
+            logger.warning("catalog listener connection closed")
+        except (OSError, asyncpg.PostgresError) as exc:
+            logger.warning("catalog listener can't connect: %s", exc)
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        delay = RECONNECT_DELAYS[min(attempt, len(RECONNECT_DELAYS) - 1)]
+        attempt += 1
+        catalog.clear()
+        answer_keys.clear()
+        await asyncio.sleep(delay)
@@ -16,9 +16,43 @@ db_settings = {
     "db_port": int(environ.get("DB_PORT")),
     "db_password": environ.get("DB_PASSWORD"),
     "db_driver": environ.get("DB_DRIVER"),
+    "pool_size": int(environ.get("DB_POOL_SIZE", "10")),
+    "max_overflow": int(environ.get("DB_MAX_OVERFLOW", "5")),
+    "pool_recycle": int(environ.get("DB_POOL_RECYCLE", "280")),
+    "pool_timeout": int(environ.get("DB_POOL_TIMEOUT", "20")),
+    "pool_pre_ping": environ.get("DB_POOL_PRE_PING", "True") == "True",
+    "echo": environ.get("DB_ECHO", "False") == "True",
+    "query_stats": environ.get("DB_QUERY_STATS", "False") == "True",
+    "slow_query_ms": float(environ.get("DB_SLOW_QUERY_MS", "200")),
+    # read replicas "host:port,host:port" with the same db, user, password
+    "replicas": [
+        host.strip()
+        for host in environ.get("DB_REPLICAS", "").split(",")
+        if host.strip()
+    ],
+    "replica_max_lag": float(environ.get("DB_REPLICA_MAX_LAG", "5")),
+    "replica_lag_check": float(environ.get("DB_REPLICA_LAG_CHECK", "5")),
 }
 
 
+# questions with answers kept in memory by each worker, 0 - no cache
+CATALOG_SIZE = int(environ.get("CATALOG_SIZE", "10000"))
+
+# seconds between reloads of the leaderboard score counts
+LEADERBOARD_REFRESH = float(environ.get("LEADERBOARD_REFRESH", "30"))
+
+# asked rounds are deleted every ROUNDS_PRUNE_INTERVAL seconds,
+# ROUNDS_PRUNE_CHUNK rows per statement
+ROUNDS_PRUNE_INTERVAL = float(environ.get("ROUNDS_PRUNE_INTERVAL", "60"))
+ROUNDS_PRUNE_CHUNK = int(environ.get("ROUNDS_PRUNE_CHUNK", "1000"))
+
+# decks of players who played recently are refilled in the background
+# up to DECK_SIZE unasked rounds when fewer than DECK_LOW are left
+DECK_SIZE = int(environ.get("DECK_SIZE", "10"))
+DECK_LOW = int(environ.get("DECK_LOW", "3"))
+DECK_REFILL_INTERVAL = float(environ.get("DECK_REFILL_INTERVAL", "1"))
+
+
 def utcnow() -> datetime:
     """Datetime object with timezone awareness."""
     now: datetime = datetime.datetime.now(tz=pytz.utc)
@@ -1,58 +1,157 @@
+import time
 from typing import AsyncGenerator
 
+import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     create_async_engine,
 )
 from sqlalchemy.orm import sessionmaker
 
-from service.config import db_settings
+from service.config import db_settings, logger
+from service.db_setup.query_stats import query_stats
+
+# replay lag of a postgres standby, 0 when it has replayed all it received
+REPLICA_LAG_QUERY = sa.text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+    "THEN 0 ELSE COALESCE(EXTRACT(EPOCH FROM "
+    "now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+REPLICA_SESSION = "replica"  # session.info key of sessions on a replica
 
 
-def connect_string() -> str:
+def connect_string(host: str | None = None) -> str:
     """String without a driver. DB_HOST should be 'db' in docker."""
+    host = host or f"{db_settings['db_host']}:{db_settings['db_port']}"
     return (
         f"{db_settings['db_user']}:{db_settings['db_password']}"
-        f"@{db_settings['db_host']}:{db_settings['db_port']}/{db_settings['db_name']}"
+        f"@{host}/{db_settings['db_name']}"
     )
 
 
-def async_database_uri() -> str:
+def async_database_uri(host: str | None = None) -> str:
     """Return the async database URL."""
-    return db_settings["db_driver"] + "://" + connect_string()
+    return db_settings["db_driver"] + "://" + connect_string(host)
 
 
 class DBManager:
+    """Owns the process-wide engines, their pools are shared by requests.
+
+    One primary engine for writes and an engine per read replica
+    (`DB_REPLICAS`). Replicas lagging more than `DB_REPLICA_MAX_LAG`
+    seconds are skipped, reads fall back to the primary.
+    """
+
     def __init__(self):
         self.engine = None
+        self._session_maker = None
+        self.replicas = []
+        self._replica_lag = {}
+        self._session_makers = {}
+        self._next_replica = 0
 
     @property
     def uri(self) -> str:
         return async_database_uri()
 
-    def get_engine(self):
-        self.engine = create_async_engine(
-            self.uri,
-            pool_size=1,
-            max_overflow=0,
-            pool_recycle=280,
-            pool_timeout=20,
-            echo=True,
+    def create_engine(self, uri: str):
+        engine = create_async_engine(
+            uri,
+            pool_size=db_settings["pool_size"],
+            max_overflow=db_settings["max_overflow"],
+            pool_recycle=db_settings["pool_recycle"],
+            pool_timeout=db_settings["pool_timeout"],
+            pool_pre_ping=db_settings["pool_pre_ping"],
+            echo=db_settings["echo"],
             future=True,
         )
+        if query_stats.enabled:
+            query_stats.attach(engine)
+        return engine
+
+    def get_engine(self):
+        self.engine = self.create_engine(self.uri)
+        self.replicas = [
+            self.create_engine(async_database_uri(host))
+            for host in db_settings["replicas"]
+        ]
+        self._replica_lag = {}
+        self._session_makers = {}
+        self._session_maker = None
         return self.engine
 
     @property
     def session_maker(self):
         if not self.engine:
             self.get_engine()
-        return sessionmaker(
-            self.engine, class_=AsyncSession, expire_on_commit=False
-        )
+        if not self._session_maker:
+            self._session_maker = sessionmaker(
+                self.engine, class_=AsyncSession, expire_on_commit=False
+            )
+        return self._session_maker
+
+    def session_maker_for(self, engine):
+        if engine is self.engine:
+            return self.session_maker
+        if engine not in self._session_makers:
+            self._session_makers[engine] = sessionmaker(
+                engine, class_=AsyncSession, expire_on_commit=False
+            )
+        return self._session_makers[engine]
+
+    async def replica_lag(self, engine) -> float:
+        """Seconds the replica is behind, checked once per interval."""
+        checked_at, lag = self._replica_lag.get(engine, (None, None))
+        now = time.monotonic()
+        if (
+            checked_at is not None
+            and now - checked_at < db_settings["replica_lag_check"]
+        ):
+            return lag
+        try:
+            async with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    lag = float(
+                        (await conn.execute(REPLICA_LAG_QUERY)).scalar()
+                    )
+                else:
+                    await conn.execute(sa.text("SELECT 1"))
+                    lag = 0.0
+        except Exception as exc:
+            logger.error("replica %s is unavailable", engine.url, exc_info=exc)
+            lag = float("inf")
+        self._replica_lag[engine] = (now, lag)
+        return lag
+
+    async def read_engine(self):
+        """Next replica (round-robin) that is not lagging, else primary."""
+        if not self.engine:
+            self.get_engine()
+        for _ in range(len(self.replicas)):
+            engine = self.replicas[self._next_replica % len(self.replicas)]
+            self._next_replica += 1
+            if (
+                await self.replica_lag(engine)
+                <= db_settings["replica_max_lag"]
+            ):
+                return engine
+        return self.engine
+
+    async def dispose(self) -> None:
+        for engine in [self.engine, *self.replicas]:
+            if engine:
+                await engine.dispose()
+        self.engine = None
+        self.replicas = []
+        self._replica_lag = {}
+        self._session_makers = {}
+        self._session_maker = None
+
+
+db_manager = DBManager()
 
 
 async def get_session() -> AsyncGenerator:
-    db_manager = DBManager()
     async with db_manager.session_maker() as session:
         try:
             yield session
@@ -62,5 +161,15 @@ async def get_session() -> AsyncGenerator:
             raise exc
         finally:
             await session.close()
-            if db_manager.engine:
-                await db_manager.engine.dispose()
+
+
+async def get_read_session() -> AsyncGenerator:
+    """Session for read-only handlers, on a replica when there is one."""
+    engine = await db_manager.read_engine()
+    async with db_manager.session_maker_for(engine)() as session:
+        if engine is not db_manager.engine:
+            session.info[REPLICA_SESSION] = True
+        try:
+            yield session
+        finally:
+            await session.close()
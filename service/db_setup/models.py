@@ -11,6 +11,7 @@ from sqlalchemy import (
     Text,  # DateTime, TIMESTAMP
     text as sa_text,
 )
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import (
     DeclarativeBase,
     Mapped,
@@ -21,6 +22,9 @@ from sqlalchemy.orm import (
 
 from service.config import utcnow
 
+# 'simple': no stemming, works for mixed english / russian questions
+TEXT_SEARCH_CONFIG = "simple"
+
 
 class Base(MappedAsDataclass, DeclarativeBase):
     """Subclasses will be converted to dataclasses"""
@@ -30,6 +34,13 @@ class Base(MappedAsDataclass, DeclarativeBase):
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        sa.Index("ix_questions_active_id", "active", "id"),
+        sa.Index(
+            "ix_questions_active_updated_dt", "active", "updated_dt", "id"
+        ),
+        sa.Index("ix_questions_text_tsv", "text_tsv", postgresql_using="gin"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     text: Mapped[str] = mapped_column(Text, nullable=True)
@@ -41,10 +52,22 @@ class Question(Base):
         server_default=sa_text("TIMEZONE('utc', now())"),
         onupdate=sa_text("TIMEZONE('utc', now())"),
     )
+    text_tsv: Mapped[str | None] = mapped_column(
+        TSVECTOR,
+        sa.Computed(
+            f"to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(text, ''))",
+            persisted=True,
+        ),
+        init=False,
+        deferred=True,
+    )
 
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        sa.Index("ix_answers_question_id_correct", "question_id", "correct"),
+    )
 
     id = Column(Integer, primary_key=True)
     text = Column(String(255), nullable=True)
@@ -66,6 +89,10 @@ class User(Base):
 
 class Player(Base):
     __tablename__ = "players"
+    __table_args__ = (
+        # leaderboard pages, ties ordered by tg_id
+        sa.Index("ix_players_score_tg_id", sa.desc("score"), "tg_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     tg_id = Column(BigInteger, unique=True, nullable=False)
@@ -74,6 +101,18 @@ class Player(Base):
 
 class Rounds(Base):
     __tablename__ = "rounds"
+    __table_args__ = (
+        sa.Index("ix_rounds_player_id_asked", "player_id", "asked"),
+        sa.UniqueConstraint(
+            "player_id", "question_id", name="uq_rounds_player_id_question_id"
+        ),
+        # chunks of asked rounds to prune
+        sa.Index(
+            "ix_rounds_asked_id",
+            "id",
+            postgresql_where=sa.text("asked"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     asked = Column(Boolean, server_default="False")
@@ -85,6 +124,56 @@ class Rounds(Base):
     )
 
 
+class Schedule(Base):
+    """When a player should see a question again (spaced repetition)"""
+
+    __tablename__ = "schedules"
+    __table_args__ = (
+        sa.Index("ix_schedules_player_id_due", "player_id", "due"),
+    )
+
+    player_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("players.tg_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    question_id: Mapped[int] = mapped_column(
+        ForeignKey("questions.id", ondelete="CASCADE"), primary_key=True
+    )
+    due: Mapped[datetime] = mapped_column(
+        sa.DateTime(timezone=True),
+        default_factory=utcnow,
+        server_default=sa_text("TIMEZONE('utc', now())"),
+    )
+    ease: Mapped[float] = mapped_column(
+        sa.Float, nullable=False, default=2.5, server_default="2.5"
+    )
+    streak: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    interval_s: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+
+
+class AnsweredChunk(Base):
+    """Bitmap of answered question ids of a player.
+
+    ANSWERED_CHUNK_BITS ids per row: bit `id % ANSWERED_CHUNK_BITS` of
+    chunk `id // ANSWERED_CHUNK_BITS`.
+    """
+
+    __tablename__ = "answered_chunks"
+
+    player_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("players.tg_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    chunk_no: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bits: Mapped[bytes] = mapped_column(sa.LargeBinary, nullable=False)
+
+
 class TgUpdate(Base):
     __tablename__ = "tg_update"
 
@@ -0,0 +1,161 @@
+import functools
+import inspect
+import re
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from service.config import db_settings, logger
+
+# name of the db accessor method ("GameDb.get_next_question_id")
+# which is running the statement right now
+current_accessor: ContextVar[str | None] = ContextVar(
+    "current_accessor", default=None
+)
+
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(
+    r"\$\d+(?:::(?:TIMESTAMP WITH(?:OUT)? TIME ZONE|\w+(?:\[\])?))?"
+    r"|%\(\w+\)s|\?"
+)
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\?(?:, \?)+\)")
+_ROW_LIST = re.compile(r"(\((?:\?|\.\.\.)(?:, \?)*\))(?:, \1)+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_sql(statement: str) -> str:
+    """Statement without literals and bound params, to group by."""
+    sql = _WHITESPACE.sub(" ", statement).strip()
+    sql = _STRING.sub("?", sql)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PARAM_LIST.sub("(...)", sql)
+    sql = _ROW_LIST.sub(r"\1, ...", sql)
+    return sql
+
+
+class LatencyHistogram:
+    """Counts of latencies in fixed buckets (ms)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float) -> None:
+        self.counts[bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def as_dict(self) -> dict:
+        labels = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3)
+            if self.count
+            else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts, strict=True)),
+        }
+
+
+class QueryStats:
+    """Per-statement and per-accessor latency, hooked on engine events.
+
+    Replaces `echo=True`: only statements slower than `slow_ms`
+    are written to the log.
+    """
+
+    def __init__(self, enabled: bool = False, slow_ms: float = 200):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.statements: dict[str, LatencyHistogram] = {}
+        self.accessors: dict[str, LatencyHistogram] = {}
+
+    def attach(self, engine) -> None:
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(
+            sync_engine, "before_cursor_execute", self._before_execute
+        )
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+        event.listen(sync_engine, "handle_error", self._handle_error)
+
+    def _before_execute(self, conn, cursor, statement, *args):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, *args):
+        started = conn.info["query_start"].pop()
+        self.record(statement, (time.perf_counter() - started) * 1000)
+
+    def _handle_error(self, context):
+        # a failed statement has no after_cursor_execute
+        conn = context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        accessor = current_accessor.get() or "-"
+        key = normalize_sql(statement)
+        if key not in self.statements:
+            self.statements[key] = LatencyHistogram()
+        self.statements[key].add(elapsed_ms)
+        if accessor not in self.accessors:
+            self.accessors[accessor] = LatencyHistogram()
+        self.accessors[accessor].add(elapsed_ms)
+        if elapsed_ms >= self.slow_ms:
+            logger.warning(
+                "slow query %.1f ms in %s: %s", elapsed_ms, accessor, key
+            )
+
+    def snapshot(self, limit: int = 20) -> dict:
+        """Hottest statements and accessors by total time spent."""
+
+        def top(stats: dict) -> list[dict]:
+            items = sorted(
+                stats.items(), key=lambda kv: kv[1].total_ms, reverse=True
+            )
+            return [{"key": k, **v.as_dict()} for k, v in items[:limit]]
+
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_ms,
+            "statements": top(self.statements),
+            "accessors": top(self.accessors),
+        }
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.accessors.clear()
+
+
+def label_accessor_methods(cls) -> None:
+    """Wrap coroutine methods of a db accessor to set `current_accessor`."""
+    for name, attr in list(vars(cls).items()):
+        if inspect.iscoroutinefunction(attr):
+            setattr(cls, name, _labelled(f"{cls.__name__}.{name}", attr))
+
+
+def _labelled(label: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        token = current_accessor.set(label)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            current_accessor.reset(token)
+
+    return wrapper
+
+
+query_stats = QueryStats(
+    enabled=db_settings["query_stats"], slow_ms=db_settings["slow_query_ms"]
+)
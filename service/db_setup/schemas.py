@@ -25,3 +25,13 @@ class UserDto:
     username: str
     password: str
     active: str
+
+
+@dataclass
+class ScheduleDto:
+    player_id: int
+    question_id: int
+    due: datetime
+    ease: float = 2.5
+    streak: int = 0
+    interval_s: int = 0
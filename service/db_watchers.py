@@ -1,3 +1,5 @@
+import re
+
 import sqlalchemy as sa
 from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.dialects.postgresql import insert as ps_insert
@@ -8,17 +10,56 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload  # , lazyload, load_only
 from sqlalchemy.sql.expression import false, true
 
+from service.answered import (
+    ANSWERED_CHUNK_BITS,
+    ANSWERED_CHUNK_BYTES,
+    AnsweredBitmap,
+    locate,
+)
 from service.config import db_settings, logger
 from service.db_setup.models import (
+    TEXT_SEARCH_CONFIG,
     Answer,
+    AnsweredChunk,
     Player,
     Question,
     Rounds,
+    Schedule,
     TgUpdate,
     User,
 )
-from service.db_setup.schemas import AnswerDto, QuestionDto
-from service.schemas import QuestionListRequest
+from service.db_setup.query_stats import label_accessor_methods, query_stats
+from service.db_setup.schemas import AnswerDto, QuestionDto, ScheduleDto
+from service.pagination import decode_cursor
+from service.schemas import QuestionListRequest, QuestionOrderSchema
+
+# NOTIFY payload is the id of a question which (or its answers) changed
+QUESTION_CHANGED_CHANNEL = "question_changed"
+
+
+def search_tsquery(text: str) -> str | None:
+    """Prefix match of every word: 'lion pre' -> 'lion:* & pre:*'"""
+    words = re.findall(r"[^\W_]+", text.lower())
+    return " & ".join(f"{word}:*" for word in words) if words else None
+
+
+def question_to_dto(question: Question) -> QuestionDto:
+    """Question with its loaded answers"""
+    return QuestionDto(
+        id=question.id,
+        text=question.text,
+        active=question.active,
+        answers=[
+            AnswerDto(
+                id=res.id,
+                text=res.text,
+                correct=res.correct,
+                question_id=res.question_id,
+            )
+            for res in question.answers
+        ],
+        updated_dt=question.updated_dt,
+    )
 
 
 class QueryTypeDb:
@@ -26,9 +67,15 @@ class QueryTypeDb:
         "postgresql" if "postgresql" in db_settings["db_driver"] else "mysql"
     )
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if query_stats.enabled:
+            label_accessor_methods(cls)
+
     def result_last_id(self, result):
         if self.DBTYPE == "postgresql":
-            return result.returned_defaults[0]
+            row = result.returned_defaults  # None when nothing is inserted
+            return row[0] if row else None
         return result.lastrowid if result.lastrowid else None
 
     def plus_do_nothing(self, query):
@@ -36,6 +83,22 @@ class QueryTypeDb:
             return query.on_conflict_do_nothing()
         return query.prefix_with("IGNORE")
 
+    def plus_do_update(self, query, index_elements: list, values: dict):
+        if self.DBTYPE == "postgresql":
+            return query.on_conflict_do_update(
+                index_elements=index_elements, set_=values
+            )
+        return query.on_duplicate_key_update(**values)
+
+    async def notify_question_changed(self, question_id: int) -> None:
+        """Sent to listeners (other workers) when the transaction commits"""
+        if self.DBTYPE != "postgresql":
+            return
+        query = sa.select(
+            sa.func.pg_notify(QUESTION_CHANGED_CHANNEL, str(question_id))
+        )
+        await self.session.execute(query)
+
     @staticmethod
     def insert(*args, **kwargs):
         if QueryTypeDb.DBTYPE == "postgresql":
@@ -55,9 +118,23 @@ class QuestionDb(QueryTypeDb):
         return self.result_last_id(result)
         # logger.info("added %s", result.returned_defaults[0])
 
+    async def add_questions(self, rows: list[dict]) -> list[int]:
+        """Multi-row insert, ids are in the order of `rows`"""
+        if not rows:
+            return []
+        if self.DBTYPE != "postgresql":
+            return [await self.add_question(vals) for vals in rows]
+        query = sa.insert(Question).returning(
+            Question.id, sort_by_parameter_order=True
+        )
+        result = await self.session.execute(query, rows)
+        return list(result.scalars().all())
+
     async def remove_question(self, id_: int) -> int:
         query = sa.delete(Question).where(*(Question.id == id_,))
         result = await self.session.execute(query)
+        if result.rowcount:
+            await self.notify_question_changed(id_)
         return result.rowcount
 
     async def edit_question_by_id(
@@ -73,6 +150,8 @@ class QuestionDb(QueryTypeDb):
             .returning(Question)
         )
         elem = (await self.session.execute(query)).scalar_one_or_none()
+        if elem:
+            await self.notify_question_changed(id_)
         return (
             QuestionDto(
                 id=elem.id,
@@ -117,26 +196,58 @@ class QuestionDb(QueryTypeDb):
             else None
         )
 
+    async def get_question_with_answers(self, id_: int) -> QuestionDto | None:
+        query = (
+            sa.select(Question)
+            .where(Question.id == id_)
+            .options(joinedload(Question.answers))
+        )
+        result = await self.session.execute(query)
+        question = result.scalars().unique().first()
+        return question_to_dto(question) if question else None
+
+    def filter_by_text(self, query, text: str | None):
+        """Full-text match on the GIN index and its rank, ILIKE on mysql"""
+        if not text:
+            return query, None
+        tsquery = search_tsquery(text)
+        if self.DBTYPE != "postgresql" or not tsquery:
+            return query.where(Question.text.ilike(f"%{text}%")), None
+        ts_query = sa.func.to_tsquery(TEXT_SEARCH_CONFIG, tsquery)
+        rank = sa.func.ts_rank(Question.text_tsv, ts_query)
+        return query.where(Question.text_tsv.op("@@")(ts_query)), rank
+
+    def order_and_page(self, query, data: dict, rank):
+        """ORDER BY with an id tiebreak, rows after the cursor (or offset)
+
+        Keyset: a deep page costs the same as the first one.
+        """
+        order = QuestionOrderSchema(data["order"] or "id").value
+        cursor = data.get("cursor") and decode_cursor(data["cursor"], order)
+        if order == "updated_dt":
+            if cursor:
+                query = query.where(
+                    sa.tuple_(Question.updated_dt, Question.id)
+                    < (cursor["dt"], cursor["id"])
+                )
+            order_by = (Question.updated_dt.desc(), Question.id.desc())
+        elif order == "relevance" and rank is not None:
+            order_by = (rank.desc(), Question.id.desc())
+        else:
+            # "active" is filtered by, so it's the same as "id"
+            if cursor:
+                query = query.where(Question.id < cursor["id"])
+            order_by = (Question.id.desc(),)
+        query = query.order_by(*order_by).limit(data["limit"])
+        return query if cursor else query.offset(data["offset"])
+
     async def get_questions(
         self, data: QuestionListRequest
     ) -> list[QuestionDto]:
         data = data.model_dump()
-        orders = {
-            "id": Question.id.desc(),
-            "updated_dt": Question.updated_dt.desc(),
-            "active": Question.active.desc(),
-        }
-        order = orders[data["order"]] if data["order"] in orders else None
-
-        query = (
-            sa.select(Question)
-            .where(Question.active == data["active"])
-            .order_by(order)
-            .limit(data["limit"])
-            .offset(data["offset"])
-        )
-        if data["text"]:
-            query = query.where(Question.text.ilike(f"%{data['text']}%"))
+        query = sa.select(Question).where(Question.active == data["active"])
+        query, rank = self.filter_by_text(query, data["text"])
+        query = self.order_and_page(query, data, rank)
         result = await self.session.execute(query)
         res = result.scalars().all()
         return [
@@ -154,17 +265,11 @@ class QuestionDb(QueryTypeDb):
         self, data: QuestionListRequest
     ) -> list[QuestionDto]:
         data = data.model_dump()
-        order = Question.id.desc() if data["order"] == "id" else None
-
-        query = (
-            sa.select(Question, Answer)
-            .where(Question.active == data["active"])
-            .order_by(order)
-            .limit(data["limit"])
-            .offset(data["offset"])
-        )
-        if data["text"]:
-            query = query.where(Question.text.ilike(f"%{data['text']}%"))
+        query = sa.select(Question, Answer).where(
+            Question.active == data["active"]
+        )
+        query, rank = self.filter_by_text(query, data["text"])
+        query = self.order_and_page(query, data, rank)
         if data.get("question_id"):
             query = query.where(Question.id == data["question_id"])
 
@@ -202,12 +307,39 @@ class AnswerDb(QueryTypeDb):
     async def add_answer(self, vals) -> int | None:
         query = sa.insert(Answer).values(**vals)
         result = await self.session.execute(query)
+        await self.notify_question_changed(vals["question_id"])
         return self.result_last_id(result)
 
+    async def add_answers(self, rows: list[dict]) -> list[int]:
+        """Multi-row insert, ids are in the order of `rows`"""
+        if not rows:
+            return []
+        if self.DBTYPE != "postgresql":
+            ids = []
+            for vals in rows:
+                result = await self.session.execute(
+                    sa.insert(Answer).values(**vals)
+                )
+                ids.append(self.result_last_id(result))
+            return ids
+        query = sa.insert(Answer).returning(
+            Answer.id, sort_by_parameter_order=True
+        )
+        result = await self.session.execute(query, rows)
+        return list(result.scalars().all())
+
     async def remove_answer(self, id_: int) -> int:
         query = sa.delete(Answer).where(Answer.id == id_)
-        result = await self.session.execute(query)
-        return result.rowcount
+        if self.DBTYPE != "postgresql":
+            result = await self.session.execute(query)
+            return result.rowcount
+        result = await self.session.execute(
+            query.returning(Answer.question_id)
+        )
+        question_ids = result.scalars().all()
+        for question_id in set(question_ids):
+            await self.notify_question_changed(question_id)
+        return len(question_ids)
 
     async def get_answer_by_id(self, ans_id: int) -> AnswerDto | None:
         query = sa.select(Answer).where(Answer.id == ans_id)
@@ -224,6 +356,18 @@ class AnswerDb(QueryTypeDb):
             else None
         )
 
+    async def correct_answer_rows(
+        self, question_ids: list[int] | None = None
+    ) -> list[tuple[int, int, str]]:
+        """(question_id, id, text) of correct answers, all or of the ids"""
+        query = sa.select(Answer.question_id, Answer.id, Answer.text).where(
+            Answer.correct == true()
+        )
+        if question_ids is not None:
+            query = query.where(Answer.question_id.in_(question_ids))
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
+
     async def get_answers_for_question(
         self, question_id: int
     ) -> list[AnswerDto]:
@@ -270,9 +414,7 @@ class UserDb(QueryTypeDb):
         return data
 
     async def put(self, session, username, password):
-        query = self.insert(
-            self.model, {"username": username, "password": password}
-        )
+        query = self.insert(self.model, username=username, password=password)
         query = self.plus_do_nothing(query)
         result = await session.execute(query)
         return self.result_last_id(result)
@@ -311,29 +453,285 @@ class GameDb(QueryTypeDb):
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
 
-    async def create_new_rounds(
-        self, user_tg_id: int, amount: int = 5
-    ) -> None:
-        """To Round model -> question_id, user_tg_id"""
-        sub_query_choice = (
-            sa.select(Question.id, sa.cast(user_tg_id, sa.Integer))
-            .order_by(sa.func.random())
+    def random_questions_query(
+        self, amount: int, unseen_by: int | None = None
+    ):
+        """Ids of up to `amount` random active questions.
+
+        Postgres: probes the (active, id) index at random points between
+        min and max id, O(amount * log n) instead of sorting the table.
+        Ids right after gaps in the sequence are a bit more likely.
+        `unseen_by` - skip questions this player answered (postgres).
+        """
+        conditions = [Question.active == 1]
+        if unseen_by is not None and self.DBTYPE == "postgresql":
+            conditions.append(~self.answered_by(unseen_by))
+        if self.DBTYPE != "postgresql":
+            return (
+                sa.select(Question.id)
+                .where(*conditions)
+                .order_by(sa.func.random())
+                .limit(amount)
+            )
+        bounds = (
+            sa.select(
+                sa.func.min(Question.id).label("lo"),
+                sa.func.max(Question.id).label("hi"),
+            )
+            .where(Question.active == 1)
+            .subquery("bounds")
+        )
+        targets = (
+            sa.select(
+                sa.cast(
+                    bounds.c.lo
+                    + sa.func.floor(
+                        sa.func.random() * (bounds.c.hi - bounds.c.lo + 1)
+                    ),
+                    sa.Integer,
+                ).label("target")
+            )
+            .select_from(
+                sa.func.generate_series(1, amount * 3).table_valued("g"),
+                bounds,
+            )
+            .subquery("targets")
+        )
+        probe = (
+            sa.select(Question.id)
+            .where(*conditions, Question.id >= targets.c.target)
+            .order_by(Question.id)
+            .limit(1)
+            .lateral("probe")
+        )
+        return (
+            sa.select(probe.c.id)
+            .select_from(targets)
+            .join(probe, sa.true())
+            .distinct()
             .limit(amount)
         )
-        query_insert_rounds = sa.insert(Rounds).from_select(
-            ["question_id", "player_id"], sub_query_choice
+
+    @staticmethod
+    def answered_by(user_tg_id):
+        """If Question.id is set in the answered bitmap of the player"""
+        return (
+            sa.exists()
+            .where(
+                AnsweredChunk.player_id == user_tg_id,
+                AnsweredChunk.chunk_no == Question.id // ANSWERED_CHUNK_BITS,
+                sa.func.get_bit(
+                    AnsweredChunk.bits, Question.id % ANSWERED_CHUNK_BITS
+                )
+                == 1,
+            )
+            .correlate_except(AnsweredChunk)
+        )
+
+    def due_questions_query(
+        self, user_tg_id: int, amount: int, review_ahead: bool = False
+    ):
+        """Active questions of the player's schedule by due time"""
+        query = (
+            sa.select(Schedule.question_id)
+            .join(Question, Question.id == Schedule.question_id)
+            .where(Schedule.player_id == user_tg_id, Question.active == 1)
+        )
+        if not review_ahead:
+            query = query.where(Schedule.due <= sa.func.now())
+        return query.order_by(Schedule.due).limit(amount)
+
+    async def create_new_rounds(
+        self, user_tg_id: int, amount: int = 5, review_ahead: bool = False
+    ) -> int:
+        """To Round model -> question_id, user_tg_id.
+
+        Due questions of the schedule first (their asked rounds are
+        reopened), then random questions the player hasn't answered.
+        `review_ahead` - questions which aren't due yet count as due.
+        """
+        insert = ps_insert if self.DBTYPE == "postgresql" else mysql_insert
+        player = sa.literal(user_tg_id, sa.BigInteger)
+        due = self.due_questions_query(
+            user_tg_id, amount, review_ahead
+        ).subquery("due")
+        query_due_rounds = self.plus_do_update(
+            insert(Rounds).from_select(
+                ["question_id", "player_id"],
+                sa.select(due.c.question_id, player),
+            ),
+            ["player_id", "question_id"],
+            {"asked": false()},
         )
         try:
-            await self.session.execute(query_insert_rounds)
+            created = (await self.session.execute(query_due_rounds)).rowcount
+            if created >= amount or review_ahead:
+                return created
+            created += await self.insert_unseen_rounds(
+                user_tg_id, amount - created
+            )
         except IntegrityError as err:
             logger.error("error ", exc_info=err)
             raise err
+        return created
+
+    async def insert_unseen_rounds(self, user_tg_id: int, amount: int) -> int:
+        """Random questions the player hasn't answered.
 
-    async def delete_old_rounds(self, user_tg_id: int) -> None:
+        The answered ones are dropped in memory, by the bitmap chunks of
+        the sample; when too many are answered, the rest is sampled with
+        the bitmap check in sql.
+        """
+        sample = await self.session.execute(
+            self.random_questions_query(amount * 4)
+        )
+        candidates = sample.scalars().all()
+        answered = await self.get_answered(
+            user_tg_id, {locate(id_)[0] for id_ in candidates}
+        )
+        fresh = [id_ for id_ in candidates if id_ not in answered][:amount]
+        created = 0
+        if fresh:
+            insert = ps_insert if self.DBTYPE == "postgresql" else mysql_insert
+            query = self.plus_do_nothing(
+                insert(Rounds).values(
+                    [
+                        {"player_id": user_tg_id, "question_id": id_}
+                        for id_ in fresh
+                    ]
+                )
+            )
+            created = (await self.session.execute(query)).rowcount
+        if created >= amount or self.DBTYPE != "postgresql":
+            return created
+        sampled = self.random_questions_query(
+            amount - created, unseen_by=user_tg_id
+        ).subquery("sampled")
+        query = self.plus_do_nothing(
+            ps_insert(Rounds).from_select(
+                ["question_id", "player_id"],
+                sa.select(sampled.c.id, sa.literal(user_tg_id, sa.BigInteger)),
+            )
+        )
+        return created + (await self.session.execute(query)).rowcount
+
+    async def refill_decks(
+        self, user_tg_ids: list[int], low: int, size: int
+    ) -> int:
+        """Top up decks with one INSERT ... SELECT.
+
+        Every player of `user_tg_ids` who has fewer than `low` unasked
+        rounds gets up to `size` of them.
+        """
+        if not user_tg_ids:
+            return 0
+        if self.DBTYPE != "postgresql":
+            created = 0
+            for user_tg_id in user_tg_ids:
+                if not await self.get_next_question_id(user_tg_id):
+                    created += await self.create_new_rounds(user_tg_id, size)
+            return created
+        players = (
+            sa.select(Player.tg_id)
+            .where(Player.tg_id.in_(user_tg_ids))
+            .subquery("candidates")
+        )
+        unasked = (
+            sa.select(sa.func.count())
+            .where(
+                Rounds.player_id == players.c.tg_id, Rounds.asked == false()
+            )
+            .correlate(players)
+            .scalar_subquery()
+        )
+        deck = (
+            sa.select(players.c.tg_id, (size - unasked).label("missing"))
+            .where(unasked < low)
+            .cte("deck")
+        )
+        due = (
+            self.due_questions_query(deck.c.tg_id, size)
+            .add_columns(sa.literal(0).label("priority"))
+            .correlate(deck)
+        )
+        unseen = sa.select(
+            sa.column("id").label("question_id"),
+            sa.literal(1).label("priority"),
+        ).select_from(
+            self.random_questions_query(size, unseen_by=deck.c.tg_id)
+            .correlate(deck)
+            .subquery("sampled")
+        )
+        # a due question can be unseen too (after reset_answered), once
+        picked = sa.union_all(due, unseen).subquery("picked")
+        picks = (
+            sa.select(picked.c.question_id, picked.c.priority)
+            .distinct(picked.c.question_id)
+            .order_by(picked.c.question_id, picked.c.priority)
+            .subquery()
+            .lateral("picks")
+        )
+        ranked = (
+            sa.select(
+                deck.c.tg_id,
+                picks.c.question_id,
+                deck.c.missing,
+                sa.func.row_number()
+                .over(partition_by=deck.c.tg_id, order_by=picks.c.priority)
+                .label("n"),
+            )
+            .select_from(deck.join(picks, sa.true()))
+            .subquery("ranked")
+        )
+        query = ps_insert(Rounds).from_select(
+            ["player_id", "question_id"],
+            sa.select(ranked.c.tg_id, ranked.c.question_id).where(
+                ranked.c.n <= ranked.c.missing
+            ),
+        )
+        query = self.plus_do_update(
+            query, ["player_id", "question_id"], {"asked": false()}
+        )
+        result = await self.session.execute(query)
+        return result.rowcount
+
+    async def delete_old_rounds(self, user_tg_id: int) -> int:
         query = sa.delete(Rounds).where(
             *(Rounds.asked == true(), Rounds.player_id == user_tg_id)
         )
-        await self.session.execute(query)
+        result = await self.session.execute(query)
+        return result.rowcount
+
+    async def prune_asked_rounds(self, chunk: int) -> int:
+        """Delete up to `chunk` asked rounds of any player"""
+        chunk_ids = (
+            sa.select(Rounds.id)
+            .where(Rounds.asked == true())
+            .limit(chunk)
+            .with_for_update(skip_locked=True)
+        )
+        if self.DBTYPE != "postgresql":  # no LIMIT in IN (subquery)
+            chunk_ids = chunk_ids.subquery("chunk").select()
+        query = sa.delete(Rounds).where(Rounds.id.in_(chunk_ids))
+        result = await self.session.execute(query)
+        return result.rowcount
+
+    async def rounds_table_size(self) -> dict:
+        """Estimated rows and bytes on disk (with indexes)"""
+        if self.DBTYPE != "postgresql":
+            query = sa.text(
+                "SELECT table_rows, data_length + index_length "
+                "FROM information_schema.tables "
+                "WHERE table_schema = DATABASE() AND table_name = 'rounds'"
+            )
+        else:
+            query = sa.text(
+                "SELECT GREATEST(reltuples, 0)::bigint, "
+                "pg_total_relation_size(oid) "
+                "FROM pg_class WHERE oid = 'rounds'::regclass"
+            )
+        rows, size = (await self.session.execute(query)).one()
+        return {"rows_estimate": int(rows or 0), "total_bytes": int(size or 0)}
 
     async def raise_score(self, user_tg_id: int) -> int | None:
         upd_query = (
@@ -355,6 +753,40 @@ class GameDb(QueryTypeDb):
         result = await self.session.execute(query)
         return result.scalars().first()
 
+    async def get_next_question(self, user_tg_id: int) -> QuestionDto | None:
+        """Question of the next round with its answers, in one query"""
+        next_id = (
+            sa.select(Rounds.question_id)
+            .where(Rounds.player_id == user_tg_id, Rounds.asked == false())
+            .limit(1)
+            .scalar_subquery()
+        )
+        query = (
+            sa.select(Question)
+            .where(Question.id == next_id)
+            .options(joinedload(Question.answers))
+        )
+        result = await self.session.execute(query)
+        question = result.scalars().unique().first()
+        return question_to_dto(question) if question else None
+
+    async def close_round(self, question_id: int, user_tg_id: int) -> bool:
+        """Mark the open round asked.
+
+        False if there was none: answered already by a concurrent or
+        repeated request.
+        """
+        query = (
+            sa.update(Rounds)
+            .where(
+                Rounds.player_id == user_tg_id,
+                Rounds.question_id == question_id,
+                Rounds.asked == false(),
+            )
+            .values(asked=true())
+        )
+        return (await self.session.execute(query)).rowcount == 1
+
     async def mark_question_answered(
         self, question_id: int, user_tg_id: int
     ) -> None:
@@ -367,9 +799,166 @@ class GameDb(QueryTypeDb):
             .values(asked=true())
         )
         await self.session.execute(query)
+        await self.mark_answered_bit(question_id, user_tg_id)
+
+    async def mark_answered_bit(
+        self, question_id: int, user_tg_id: int
+    ) -> None:
+        chunk_no, bit = locate(question_id)
+        if self.DBTYPE != "postgresql":
+            answered = await self.get_answered(user_tg_id, {chunk_no})
+            answered.add(question_id)
+            bits = answered.chunks[chunk_no]
+            query = self.insert(
+                AnsweredChunk,
+                player_id=user_tg_id,
+                chunk_no=chunk_no,
+                bits=bits,
+            ).on_duplicate_key_update(bits=bits)
+            await self.session.execute(query)
+            return
+        empty = sa.func.decode(
+            sa.func.repeat("00", ANSWERED_CHUNK_BYTES), "hex"
+        )
+        query = self.insert(
+            AnsweredChunk,
+            player_id=user_tg_id,
+            chunk_no=chunk_no,
+            bits=sa.func.set_bit(empty, bit, 1),
+        ).on_conflict_do_update(
+            index_elements=["player_id", "chunk_no"],
+            set_={"bits": sa.func.set_bit(AnsweredChunk.bits, bit, 1)},
+        )
+        await self.session.execute(query)
+
+    async def get_answered(
+        self, user_tg_id: int, chunk_nos: set[int] | None = None
+    ) -> AnsweredBitmap:
+        """Answered bitmap of the player, only `chunk_nos` if given"""
+        query = sa.select(AnsweredChunk.chunk_no, AnsweredChunk.bits).where(
+            AnsweredChunk.player_id == user_tg_id
+        )
+        if chunk_nos is not None:
+            if not chunk_nos:
+                return AnsweredBitmap()
+            query = query.where(AnsweredChunk.chunk_no.in_(chunk_nos))
+        result = await self.session.execute(query)
+        return AnsweredBitmap(
+            {chunk_no: bytes(bits) for chunk_no, bits in result.all()}
+        )
+
+    async def has_unanswered(self, user_tg_id: int) -> bool:
+        """Any active question not in the answered bitmap of the player"""
+        if self.DBTYPE != "postgresql":
+            answered = await self.get_answered(user_tg_id)
+            result = await self.session.execute(
+                sa.select(Question.id).where(Question.active == 1)
+            )
+            return any(id_ not in answered for id_ in result.scalars())
+        query = sa.select(
+            sa.exists().where(
+                Question.active == 1, ~self.answered_by(user_tg_id)
+            )
+        )
+        return (await self.session.execute(query)).scalar()
+
+    async def reset_answered(self, user_tg_id: int) -> int:
+        query = sa.delete(AnsweredChunk).where(
+            AnsweredChunk.player_id == user_tg_id
+        )
+        return (await self.session.execute(query)).rowcount
+
+    async def get_schedule(
+        self, user_tg_id: int, question_id: int
+    ) -> ScheduleDto | None:
+        query = sa.select(Schedule).where(
+            Schedule.player_id == user_tg_id,
+            Schedule.question_id == question_id,
+        )
+        elem = (await self.session.execute(query)).scalar_one_or_none()
+        return (
+            ScheduleDto(
+                player_id=elem.player_id,
+                question_id=elem.question_id,
+                due=elem.due,
+                ease=elem.ease,
+                streak=elem.streak,
+                interval_s=elem.interval_s,
+            )
+            if elem
+            else None
+        )
+
+    async def save_schedule(self, schedule: ScheduleDto) -> None:
+        values = {
+            "due": schedule.due,
+            "ease": schedule.ease,
+            "streak": schedule.streak,
+            "interval_s": schedule.interval_s,
+        }
+        query = self.insert(
+            Schedule,
+            player_id=schedule.player_id,
+            question_id=schedule.question_id,
+            **values,
+        )
+        query = self.plus_do_update(
+            query, ["player_id", "question_id"], values
+        )
+        await self.session.execute(query)
+
+    async def score_counts(self) -> dict[int, int]:
+        """Number of players with each score"""
+        query = sa.select(Player.score, sa.func.count()).group_by(Player.score)
+        result = await self.session.execute(query)
+        return dict(result.all())
+
+    async def count_players_above(self, score: int) -> int:
+        query = sa.select(sa.func.count()).where(Player.score > score)
+        return (await self.session.execute(query)).scalar_one()
+
+    async def top_players(self, limit: int) -> list[tuple[int, int]]:
+        """(tg_id, score) by score, ties by tg_id"""
+        query = (
+            sa.select(Player.tg_id, Player.score)
+            .order_by(Player.score.desc(), Player.tg_id)
+            .limit(limit)
+        )
+        result = await self.session.execute(query)
+        return [tuple(row) for row in result.all()]
+
+    async def players_around(
+        self, user_tg_id: int, score: int, amount: int
+    ) -> list[tuple[int, int]]:
+        """`amount` players right above and below, in leaderboard order"""
+        above = (
+            sa.select(Player.tg_id, Player.score)
+            .where(
+                Player.score >= score,
+                sa.or_(Player.score > score, Player.tg_id < user_tg_id),
+            )
+            .order_by(Player.score, Player.tg_id.desc())
+            .limit(amount)
+        )
+        below = (
+            sa.select(Player.tg_id, Player.score)
+            .where(
+                Player.score <= score,
+                sa.or_(Player.score < score, Player.tg_id > user_tg_id),
+            )
+            .order_by(Player.score.desc(), Player.tg_id)
+            .limit(amount)
+        )
+        above_rows = (await self.session.execute(above)).all()
+        below_rows = (await self.session.execute(below)).all()
+        return [
+            *(tuple(row) for row in reversed(above_rows)),
+            (user_tg_id, score),
+            *(tuple(row) for row in below_rows),
+        ]
 
     async def create_player(self, user_tg_id: int) -> int | None:
-        query = self.insert(Player, {"tg_id": user_tg_id})
+        query = self.insert(Player, tg_id=user_tg_id)
         query = self.plus_do_nothing(query)
         result = await self.session.execute(query)
         return self.result_last_id(result)
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from service.config import (
+    DECK_LOW,
+    DECK_REFILL_INTERVAL,
+    DECK_SIZE,
+    logger,
+)
+from service.db_setup.db_settings import db_manager
+from service.db_watchers import GameDb
+
+
+class DeckBuilder:
+    """Refills rounds of the players who played since the last run.
+
+    All of them in one statement, so the game requests find their next
+    round ready and only read.
+    """
+
+    def __init__(
+        self, low: int = DECK_LOW, size: int = DECK_SIZE, batch: int = 1000
+    ):
+        self.low = low
+        self.size = size
+        self.batch = batch
+        self.played: set[int] = set()
+        self.runs = 0
+        self.players_checked = 0
+        self.rounds_created = 0
+        self.last_run_ms = 0.0
+
+    def touch(self, tg_id: int) -> None:
+        self.played.add(tg_id)
+
+    def take_batch(self) -> list[int]:
+        batch = []
+        while self.played and len(batch) < self.batch:
+            batch.append(self.played.pop())
+        return batch
+
+    async def refill(self, tg_ids: list[int]) -> int:
+        session_maker = db_manager.session_maker
+        async with session_maker() as session, session.begin():
+            return await GameDb(session).refill_decks(
+                tg_ids, self.low, self.size
+            )
+
+    async def run_once(self) -> int:
+        created = 0
+        started = time.perf_counter()
+        while tg_ids := self.take_batch():
+            try:
+                created += await self.refill(tg_ids)
+            except (OSError, SQLAlchemyError):
+                self.played.update(tg_ids)  # next time
+                raise
+            self.players_checked += len(tg_ids)
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        self.rounds_created += created
+        self.runs += 1
+        return created
+
+    def stats(self) -> dict:
+        return {
+            "waiting_players": len(self.played),
+            "runs": self.runs,
+            "players_checked": self.players_checked,
+            "rounds_created": self.rounds_created,
+            "last_run_ms": round(self.last_run_ms, 3),
+        }
+
+
+deck_builder = DeckBuilder()
+
+
+async def refill_decks_forever(interval: float = DECK_REFILL_INTERVAL):
+    while True:
+        try:
+            await deck_builder.run_once()
+        except (OSError, SQLAlchemyError) as exc:
+            logger.warning("decks not refilled: %s", exc)
+        await asyncio.sleep(interval)
@@ -1,20 +1,24 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from service.config import logger
-from service.db_setup.db_settings import get_session
-from service.errors import AnswerNotAddedError
+from service.db_setup.db_settings import get_read_session, get_session
+from service.errors import AnswerNotAddedError, InvalidCursorError
 from service.schemas import (
     AnswerAddRequest,
     AnswerAddResponse,
+    AnswersSubmitRequest,
+    AnswersSubmitResponse,
     AnswerSubmitRequest,
     DeleteResponse,
     IsCorrectAnsResponse,
     QuestionAddRequest,
     QuestionAddResponse,
+    QuestionBulkRequest,
+    QuestionBulkResponse,
     QuestionEditRequest,
     QuestionListRequest,
     QuestionResponse,
@@ -27,6 +31,8 @@ api_router = APIRouter(
     tags=["quiz"],
 )
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 @api_router.get(
     "/show-quiz",
@@ -37,13 +43,21 @@ api_router = APIRouter(
     },
 )
 async def show_quiz(
+    response: Response,
     params: QuestionListRequest = Depends(),
-    session: AsyncSession = Depends(get_session),  # type: ignore
+    session: AsyncSession = Depends(get_read_session),  # type: ignore
 ):
-    """Show quiz-test page"""
+    """Show quiz-test page, cursor of the next page is in X-Next-Cursor"""
     data = QuestionListRequest(**params.__dict__)
     q_manager = QuestionsManager(session)
-    questions = await q_manager.get_questions_with_answers(data)
+    try:
+        questions, cursor = await q_manager.get_quiz_page(data)
+    except InvalidCursorError as err:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, err.add_detail
+        ) from err
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     return questions if questions else {}
 
 
@@ -56,11 +70,20 @@ async def show_quiz(
     },
 )
 async def get_questions(
-    data: QuestionListRequest, session: AsyncSession = Depends(get_session)
+    data: QuestionListRequest,
+    response: Response,
+    session: AsyncSession = Depends(get_read_session),
 ) -> list[QuestionResponse]:
-    """Get_questions"""
+    """Get_questions, cursor of the next page is in X-Next-Cursor"""
     q_manager = QuestionsManager(session)
-    questions = await q_manager.get_questions(data)
+    try:
+        questions, cursor = await q_manager.get_questions_page(data)
+    except InvalidCursorError as err:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, err.add_detail
+        ) from err
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     return questions if questions else []
 
 
@@ -84,6 +107,28 @@ async def add_question(
     return {"created": False}
 
 
+@api_router.post(
+    "/questions:bulk",
+    status_code=status.HTTP_201_CREATED,
+    response_model=QuestionBulkResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def add_questions_bulk(
+    data: QuestionBulkRequest, session: AsyncSession = Depends(get_session)
+):
+    """Add questions with their answers in one transaction"""
+    q_manager = QuestionsManager(session)
+    try:
+        return await q_manager.add_questions_bulk(data)
+    except IntegrityError as err:
+        text_err = f"questions not added: {err.args}"
+        logger.error(text_err)
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, text_err) from err
+
+
 @api_router.put(
     "/edit-question",
     responses={
@@ -166,6 +211,23 @@ async def submit_answer(
     return is_corr_ans
 
 
+@api_router.post(
+    "/submit-answers",
+    response_model=AnswersSubmitResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def submit_answers(
+    data: AnswersSubmitRequest,
+    session: AsyncSession = Depends(get_session),
+):
+    """Grade answers of a whole quiz page"""
+    q_manager = QuestionsManager(session)
+    return await q_manager.grade_answers(data)
+
+
 @api_router.delete(
     "/delete-answer",
     response_model=DeleteResponse,
@@ -3,17 +3,24 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from service.config import logger
-from service.db_setup.db_settings import get_session
+from service.db_setup.db_settings import get_read_session, get_session
 from service.db_watchers import GameDb
 from service.schemas import (
+    LeaderboardAroundRequest,
+    LeaderboardEntry,
+    LeaderboardResponse,
+    LeaderboardTopRequest,
     MarkAnsweredResponse,
     QuestionGetOneRequest,
     QuestionIdResponse,
+    QuestionInQuizResponse,
     QuestionResponse,
+    RoundAnswerRequest,
+    RoundAnswerResponse,
     ScoreResponse,
     TgPlayerIdRequest,
 )
-from service.utils import QuestionsManager
+from service.utils import GameManager, QuestionsManager
 
 api_router = APIRouter(
     prefix="/v1",
@@ -37,7 +44,10 @@ async def get_round_question(
     q_manager = QuestionsManager(session)
     db_game = GameDb(session)
     try:
-        await db_game.create_new_rounds(data.tg_id)
+        if not data.question_id and not await db_game.get_next_question_id(
+            data.tg_id
+        ):
+            await GameManager(session).create_new_rounds(data.tg_id)
     except IntegrityError as err:
         text_err = "error. maybe tg_id is wrong"
         logger.error(text_err)
@@ -70,7 +80,7 @@ async def get_round_question_id(
     db_game = GameDb(session)
     try:
         if not await db_game.get_next_question_id(data.tg_id):
-            await db_game.create_new_rounds(data.tg_id)
+            await GameManager(session).create_new_rounds(data.tg_id)
     except IntegrityError as err:
         text_err = "error. maybe tg_id is wrong"
         logger.error(text_err)
@@ -84,6 +94,62 @@ async def get_round_question_id(
     return QuestionIdResponse(question_id=question_id)
 
 
+@api_router.post(
+    "/next-round",
+    response_model=QuestionInQuizResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Not found"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def next_round(
+    data: TgPlayerIdRequest, session: AsyncSession = Depends(get_session)
+) -> QuestionInQuizResponse:
+    """Next question in round for this user with its answer options"""
+    game_manager = GameManager(session)
+    try:
+        question = await game_manager.next_round(data.tg_id)
+    except IntegrityError as err:
+        text_err = "error. maybe tg_id is wrong"
+        logger.error(text_err)
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            text_err,
+        ) from err
+    if question is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    return question
+
+
+@api_router.post(
+    "/answer-round",
+    response_model=RoundAnswerResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Not found"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def answer_round(
+    data: RoundAnswerRequest, session: AsyncSession = Depends(get_session)
+) -> RoundAnswerResponse:
+    """Submit answer, edit score, mark answered and get the next question"""
+    game_manager = GameManager(session)
+    try:
+        res = await game_manager.answer_and_advance(data)
+    except IntegrityError as err:
+        text_err = "error. maybe tg_id is wrong"
+        logger.error(text_err)
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST,
+            text_err,
+        ) from err
+    if res is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    return res
+
+
 @api_router.put(
     "/edit-score",
     responses={
@@ -96,8 +162,8 @@ async def edit_player_score(
     session: AsyncSession = Depends(get_session),
 ):
     """Request for edit_score"""
-    db_game = GameDb(session)
-    score = await db_game.raise_score(params.tg_id)
+    game_manager = GameManager(session)
+    score = await game_manager.raise_score(params.tg_id)
     return {"success": "1", "score": score}
 
 
@@ -128,7 +194,7 @@ async def add_player(
 )
 async def player_score(
     params=Depends(TgPlayerIdRequest),
-    session: AsyncSession = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
 ):
     """Request for player_score"""
     db_game = GameDb(session)
@@ -154,3 +220,62 @@ async def mark_answered(
     db_game = GameDb(session)
     await db_game.mark_question_answered(data.question_id, data.tg_id)
     return {"success": True}
+
+
+@api_router.get(
+    "/leaderboard/top",
+    response_model=LeaderboardResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def leaderboard_top(
+    params=Depends(LeaderboardTopRequest),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Players with the highest score"""
+    game_manager = GameManager(session)
+    return await game_manager.top_players(params.limit)
+
+
+@api_router.get(
+    "/leaderboard/rank",
+    response_model=LeaderboardEntry,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Not found"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def leaderboard_rank(
+    params=Depends(TgPlayerIdRequest),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """Rank of the player"""
+    game_manager = GameManager(session)
+    res = await game_manager.player_rank(params.tg_id)
+    if res is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    return res
+
+
+@api_router.get(
+    "/leaderboard/around",
+    response_model=LeaderboardResponse,
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "Not found"},
+        status.HTTP_400_BAD_REQUEST: {"description": "Bad request"},
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def leaderboard_around(
+    params=Depends(LeaderboardAroundRequest),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """The player with the players right above and below"""
+    game_manager = GameManager(session)
+    res = await game_manager.players_around(params.tg_id, params.amount)
+    if res is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not found")
+    return res
@@ -0,0 +1,62 @@
+from fastapi import APIRouter, status
+
+from service.answer_key import answer_keys
+from service.catalog import catalog
+from service.db_setup.query_stats import query_stats
+from service.deck_builder import deck_builder
+from service.maintenance import rounds_pruner
+from service.schemas import (
+    AnswerKeysStatsResponse,
+    CatalogStatsResponse,
+    DecksStatsResponse,
+    QueryStatsResponse,
+    RoundsStatsResponse,
+)
+
+api_router = APIRouter(
+    prefix="/v1/stats",
+    tags=["stats"],
+)
+
+
+@api_router.get(
+    "/queries",
+    response_model=QueryStatsResponse,
+    responses={
+        status.HTTP_422_UNPROCESSABLE_ENTITY: {"description": "Bad request"},
+    },
+)
+async def show_query_stats(limit: int = 20):
+    """Latency of the hottest statements and db accessor methods"""
+    return query_stats.snapshot(limit)
+
+
+@api_router.delete("/queries")
+async def reset_query_stats():
+    """Start collecting query latency from scratch"""
+    query_stats.reset()
+    return {"success": "1"}
+
+
+@api_router.get("/catalog", response_model=CatalogStatsResponse)
+async def show_catalog_stats():
+    """Hits and misses of the in-memory question catalog"""
+    return catalog.stats()
+
+
+@api_router.get("/rounds", response_model=RoundsStatsResponse)
+async def show_rounds_stats():
+    """Size of the rounds table and pruning of asked rounds"""
+    return rounds_pruner.stats()
+
+
+@api_router.get("/decks", response_model=DecksStatsResponse)
+async def show_decks_stats():
+    """Background refills of the players' rounds"""
+    return deck_builder.stats()
+
+
+@api_router.get("/answer-keys", response_model=AnswerKeysStatsResponse)
+async def show_answer_keys_stats():
+    """Gradings served by the in-memory answer keys"""
+    return answer_keys.stats()
@@ -6,3 +6,10 @@ class AnswerNotAddedError(Exception):
 
     def __init__(self, err):
         self.add_detail = self.detail + f"{err.args}"
+
+
+class InvalidCursorError(Exception):
+    detail: str = "InvalidCursor"
+
+    def __init__(self, cursor):
+        self.add_detail = self.detail + f" {cursor!r}"
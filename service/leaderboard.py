@@ -0,0 +1,129 @@
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from service.config import LEADERBOARD_REFRESH, logger
+from service.db_setup.db_settings import get_read_session
+from service.db_watchers import GameDb
+
+PENDING_RAISES = "leaderboard_raised"
+
+
+class ScoreTree:
+    """Fenwick tree of player counts per score.
+
+    Rank of a score (1 + players with a higher one) in O(log max_score).
+    """
+
+    def __init__(self, size: int = 1024):
+        self.counts = [0] * size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+
+    @classmethod
+    def from_counts(cls, score_counts: dict[int, int]) -> "ScoreTree":
+        size = 1024
+        while score_counts and size <= max(score_counts):
+            size *= 2
+        tree = cls(size)
+        for score, count in score_counts.items():
+            tree.counts[score] = count
+        tree.rebuild()
+        return tree
+
+    def rebuild(self) -> None:
+        """O(size) build from `counts`"""
+        self.tree = [0, *self.counts]
+        for i in range(1, len(self.tree)):
+            parent = i + (i & -i)
+            if parent < len(self.tree):
+                self.tree[parent] += self.tree[i]
+        self.total = sum(self.counts)
+
+    def add(self, score: int, delta: int = 1) -> None:
+        if score >= len(self.counts):
+            size = len(self.counts)
+            while size <= score:
+                size *= 2
+            self.counts.extend([0] * (size - len(self.counts)))
+            self.counts[score] += delta
+            self.rebuild()
+            return
+        self.counts[score] += delta
+        self.total += delta
+        i = score + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def count_upto(self, score: int) -> int:
+        """Players with a score <= `score`"""
+        i = min(score + 1, len(self.tree) - 1)
+        found = 0
+        while i > 0:
+            found += self.tree[i]
+            i -= i & -i
+        return found
+
+    def rank(self, score: int) -> int:
+        return 1 + self.total - self.count_upto(score)
+
+
+class Leaderboard:
+    """Score counts of all players, kept by each worker.
+
+    Raises of this worker are applied once their transaction commits,
+    the others come with the next reload (every LEADERBOARD_REFRESH
+    seconds).
+    """
+
+    def __init__(self):
+        self.tree: ScoreTree | None = None
+
+    def load(self, score_counts: dict[int, int]) -> None:
+        self.tree = ScoreTree.from_counts(score_counts)
+
+    def score_raised(self, score: int | None) -> None:
+        if self.tree is None or not score:
+            return
+        self.tree.add(score - 1, -1)
+        self.tree.add(score)
+
+    def score_raised_on_commit(self, session, score: int | None) -> None:
+        """Apply the raise after `session` commits"""
+        session.info.setdefault(PENDING_RAISES, []).append(score)
+
+    def rank(self, score: int) -> int | None:
+        """None before the first load"""
+        return self.tree.rank(score) if self.tree is not None else None
+
+    @property
+    def players(self) -> int | None:
+        return self.tree.total if self.tree is not None else None
+
+
+leaderboard = Leaderboard()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session):
+    for score in session.info.pop(PENDING_RAISES, ()):
+        leaderboard.score_raised(score)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop(PENDING_RAISES, None)
+
+
+async def refresh_leaderboard() -> None:
+    """Reload score counts of all players, forever"""
+    while True:
+        try:
+            async for session in get_read_session():
+                leaderboard.load(await GameDb(session).score_counts())
+        except (OSError, SQLAlchemyError) as exc:
+            logger.warning("leaderboard not loaded: %s", exc)
+        await asyncio.sleep(LEADERBOARD_REFRESH)
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from service.config import ROUNDS_PRUNE_CHUNK, ROUNDS_PRUNE_INTERVAL, logger
+from service.db_setup.db_settings import db_manager
+from service.db_watchers import GameDb
+
+
+class RoundsPruner:
+    """Deletes asked rounds in small chunks, one transaction per chunk.
+
+    Short transactions keep row locks and vacuum work small, so the game
+    queries running meanwhile are not held up.
+    """
+
+    def __init__(self, chunk: int = ROUNDS_PRUNE_CHUNK):
+        self.chunk = chunk
+        self.pruned_total = 0
+        self.runs = 0
+        self.last_pruned = 0
+        self.last_run_ms = 0.0
+        self.table_size: dict = {}
+
+    async def prune_chunk(self) -> int:
+        session_maker = db_manager.session_maker
+        async with session_maker() as session, session.begin():
+            return await GameDb(session).prune_asked_rounds(self.chunk)
+
+    async def read_table_size(self) -> None:
+        session_maker = db_manager.session_maker
+        async with session_maker() as session:
+            self.table_size = await GameDb(session).rounds_table_size()
+
+    async def run_once(self, pause: float = 0.01) -> int:
+        """Prune until a chunk comes short"""
+        started = time.perf_counter()
+        pruned = 0
+        while True:
+            deleted = await self.prune_chunk()
+            pruned += deleted
+            if deleted < self.chunk:
+                break
+            await asyncio.sleep(pause)
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        self.last_pruned = pruned
+        self.pruned_total += pruned
+        self.runs += 1
+        await self.read_table_size()
+        return pruned
+
+    def stats(self) -> dict:
+        return {
+            **self.table_size,
+            "pruned_total": self.pruned_total,
+            "runs": self.runs,
+            "last_pruned": self.last_pruned,
+            "last_run_ms": round(self.last_run_ms, 3),
+            "last_rows_per_sec": round(
+                self.last_pruned / self.last_run_ms * 1000, 1
+            )
+            if self.last_run_ms
+            else 0.0,
+        }
+
+
+rounds_pruner = RoundsPruner()
+
+
+async def prune_rounds_forever(interval: float = ROUNDS_PRUNE_INTERVAL):
+    while True:
+        try:
+            await rounds_pruner.run_once()
+        except (OSError, SQLAlchemyError) as exc:
+            logger.warning("rounds not pruned: %s", exc)
+        await asyncio.sleep(interval)
@@ -0,0 +1,38 @@
+import base64
+import json
+from datetime import datetime
+
+from service.errors import InvalidCursorError
+
+# orders that can be continued from the last row of a page
+KEYSET_ORDERS = ("id", "active", "updated_dt")
+
+
+def encode_cursor(order: str, question) -> str:
+    """Opaque cursor after `question`: its (updated_dt, id) or id"""
+    payload = {"o": order, "id": question.id}
+    if order == "updated_dt":
+        payload["dt"] = question.updated_dt.isoformat()
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str) -> dict:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["o"] != order or order not in KEYSET_ORDERS:
+            raise ValueError("cursor of another order")
+        keys = {"id": int(payload["id"])}
+        if order == "updated_dt":
+            keys["dt"] = datetime.fromisoformat(payload["dt"])
+    except (ValueError, KeyError, TypeError) as err:
+        raise InvalidCursorError(cursor) from err
+    return keys
+
+
+def next_cursor(order, questions: list, last_page: bool) -> str | None:
+    order = getattr(order, "value", order) or "id"
+    if last_page or not questions or order not in KEYSET_ORDERS:
+        return None
+    return encode_cursor(order, questions[-1])
@@ -0,0 +1,42 @@
+from dataclasses import replace
+from datetime import datetime, timedelta
+
+from service.db_setup.schemas import ScheduleDto
+
+MIN_EASE = 1.3
+MAX_EASE = 3.0
+# a wrong answer comes back after a minute
+RETRY_INTERVAL_S = 60
+# intervals after the 1st and 2nd correct answer in a row,
+# later ones are the previous interval times ease
+FIRST_INTERVALS_S = (10 * 60, 24 * 60 * 60)
+# intervals stop growing here (schedules.interval_s is an int4)
+MAX_INTERVAL_S = 180 * 24 * 60 * 60
+
+
+def next_review(
+    schedule: ScheduleDto, correct: bool, now: datetime
+) -> ScheduleDto:
+    """SM-2 like update of a schedule after an answer"""
+    if not correct:
+        return replace(
+            schedule,
+            due=now + timedelta(seconds=RETRY_INTERVAL_S),
+            ease=max(MIN_EASE, schedule.ease - 0.2),
+            streak=0,
+            interval_s=RETRY_INTERVAL_S,
+        )
+    streak = schedule.streak + 1
+    if streak <= len(FIRST_INTERVALS_S):
+        interval_s = FIRST_INTERVALS_S[streak - 1]
+    else:
+        interval_s = min(
+            MAX_INTERVAL_S, int(schedule.interval_s * schedule.ease)
+        )
+    return replace(
+        schedule,
+        due=now + timedelta(seconds=interval_s),
+        ease=min(MAX_EASE, schedule.ease + 0.1),
+        streak=streak,
+        interval_s=interval_s,
+    )
@@ -13,6 +13,7 @@ class QuestionOrderSchema(str, Enum):
     id = "id"
     active = "active"
     updated_dt = "updated_dt"
+    relevance = "relevance"  # of the text search
 
 
 class QuestionListRequest(BaseModel):
@@ -24,6 +25,10 @@ class QuestionListRequest(BaseModel):
     )
     offset: int | None = Field(description="offset to show on page", default=0)
     limit: int | None = Field(description="limit to show on page", default=50)
+    cursor: str | None = Field(
+        description="X-Next-Cursor of the previous page, instead of offset",
+        default=None,
+    )
 
     class Config:
         json_schema_extra = {
@@ -75,6 +80,41 @@ class QuestionEditRequest(BaseModel):
         }
 
 
+class BulkAnswerItem(BaseModel):
+    text: str = Field(description="text", min_length=1, max_length=50)
+    correct: bool = Field(description="if answer is correct")
+
+
+class BulkQuestionItem(BaseModel):
+    text: str = Field(description="text", min_length=1, max_length=255)
+    active: int = Field(description="if question is active", default=1)
+    answers: list[BulkAnswerItem] = Field(default_factory=list)
+
+
+class QuestionBulkRequest(BaseModel):
+    questions: list[dict[str, Any]] = Field(
+        description="BulkQuestionItem-s, a bad one doesn't fail the others",
+        min_length=1,
+        max_length=1000,
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "questions": [
+                    {
+                        "text": "question1",
+                        "active": 1,
+                        "answers": [
+                            {"text": "answer1", "correct": True},
+                            {"text": "answer2", "correct": False},
+                        ],
+                    }
+                ]
+            }
+        }
+
+
 class QuestionResponse(BaseModel):
     id: int = Field(description="id of a question")
     text: str = Field(description="text")
@@ -139,6 +179,17 @@ class AnswerSubmitRequest(BaseModel):
         json_schema_extra = {"example": {"answer_ids": [1], "question_id": 1}}
 
 
+class RoundAnswerRequest(BaseModel):
+    tg_id: int = Field(description="tg_id of a player")
+    question_id: int = Field(description="id of a question")
+    answer_ids: list[int] = Field(min_length=1)
+
+    class Config:
+        json_schema_extra = {
+            "example": {"tg_id": 1, "question_id": 1, "answer_ids": [1]}
+        }
+
+
 class AnswerResponse(BaseModel):
     id: int = Field(description="id of an answer")
     text: str = Field(description="text")
@@ -160,6 +211,17 @@ class TgPlayerIdRequest(BaseModel):
     tg_id: int = Field(description="tg_id")
 
 
+class LeaderboardTopRequest(BaseModel):
+    limit: int = Field(description="players to show", default=10, ge=1, le=100)
+
+
+class LeaderboardAroundRequest(BaseModel):
+    tg_id: int = Field(description="tg_id")
+    amount: int = Field(
+        description="players above and below", default=5, ge=1, le=50
+    )
+
+
 class TgUpdateIdRequest(BaseModel):
     update_id: int = Field(description="update_id")
 
@@ -182,6 +244,36 @@ class IsCorrectAnsResponse(BaseModel):
     answers: list[AnswerInResponse]
 
 
+class AnswersSubmitRequest(BaseModel):
+    answers: list[AnswerSubmitRequest] = Field(
+        description="answers of a quiz page", min_length=1, max_length=500
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "answers": [
+                    {"question_id": 1, "answer_ids": [1]},
+                    {"question_id": 2, "answer_ids": [5, 6]},
+                ]
+            }
+        }
+
+
+class GradedAnswerResponse(BaseModel):
+    question_id: int
+    correct: bool | None = Field(
+        description="None if the question isn't found or not answered"
+    )
+    answers: list[AnswerInResponse] = Field(default_factory=list)
+
+
+class AnswersSubmitResponse(BaseModel):
+    total: int = Field(description="number of graded questions")
+    correct: int = Field(description="number of correct answers")
+    results: list[GradedAnswerResponse]
+
+
 class ScoreResponse(BaseModel):
     score: int
 
@@ -197,6 +289,13 @@ class QuestionInQuizResponse(BaseModel):
     answers: list[AnswerInResponse]
 
 
+class RoundAnswerResponse(BaseModel):
+    correct: bool
+    answers: list[AnswerInResponse] = Field(description="correct answers")
+    score: int | None = Field(description="score of the player")
+    next_question: QuestionInQuizResponse | None = None
+
+
 class QuizResponse(RootModel):
     root: Dict[int, QuestionInQuizResponse]
 
@@ -234,6 +333,50 @@ class QuestionAddResponse(BaseModel):
         }
 
 
+class BulkItemResponse(BaseModel):
+    index: int = Field(description="position in the request")
+    id: int | None = Field(description="id of created question", default=None)
+    answer_ids: list[int] = Field(default_factory=list)
+    error: str | None = Field(description="why it's skipped", default=None)
+
+
+class QuestionBulkResponse(BaseModel):
+    created: int = Field(description="number of created questions")
+    items: list[BulkItemResponse]
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "created": 1,
+                "items": [
+                    {"index": 0, "id": 1, "answer_ids": [1, 2], "error": None}
+                ],
+            }
+        }
+
+
+class LeaderboardEntry(BaseModel):
+    tg_id: int
+    score: int
+    rank: int = Field(description="1 + players with a higher score")
+
+
+class LeaderboardResponse(BaseModel):
+    players: list[LeaderboardEntry]
+    total: int | None = Field(description="number of players", default=None)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "players": [
+                    {"tg_id": 1, "score": 12, "rank": 1},
+                    {"tg_id": 2, "score": 10, "rank": 2},
+                ],
+                "total": 2,
+            }
+        }
+
+
 class MarkAnsweredResponse(BaseModel):
     success: bool = Field(description="is answered")
 
@@ -243,3 +386,56 @@ class MarkAnsweredResponse(BaseModel):
                 "success": True,
             }
         }
+
+
+class LatencyStatResponse(BaseModel):
+    key: str = Field(description="normalized sql or accessor method")
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    buckets: dict[str, int] = Field(description="histogram, ms")
+
+
+class QueryStatsResponse(BaseModel):
+    enabled: bool
+    slow_query_ms: float
+    statements: list[LatencyStatResponse]
+    accessors: list[LatencyStatResponse]
+
+
+class CatalogStatsResponse(BaseModel):
+    size: int = Field(description="questions in the catalog")
+    max_size: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    invalidations: int
+
+
+class RoundsStatsResponse(BaseModel):
+    rows_estimate: int | None = Field(description="rounds rows", default=None)
+    total_bytes: int | None = Field(
+        description="table with indexes", default=None
+    )
+    pruned_total: int = Field(description="asked rounds deleted")
+    runs: int
+    last_pruned: int
+    last_run_ms: float
+    last_rows_per_sec: float
+
+
+class DecksStatsResponse(BaseModel):
+    waiting_players: int = Field(description="played since the last run")
+    runs: int
+    players_checked: int
+    rounds_created: int
+    last_run_ms: float
+
+
+class AnswerKeysStatsResponse(BaseModel):
+    size: int = Field(description="questions with a key in memory")
+    loaded: bool
+    hits: int
+    misses: int = Field(description="graded from the db")
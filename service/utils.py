@@ -1,17 +1,31 @@
+from pydantic import ValidationError
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from service.config import logger
-from service.db_setup.schemas import AnswerDto, QuestionDto
-from service.db_watchers import AnswerDb, QuestionDb
+from service.answer_key import AnswerKey, answer_keys, build_keys
+from service.catalog import catalog
+from service.config import logger, utcnow
+from service.db_setup.schemas import AnswerDto, QuestionDto, ScheduleDto
+from service.db_watchers import AnswerDb, GameDb, QuestionDb
+from service.deck_builder import deck_builder
+from service.leaderboard import leaderboard
+from service.pagination import next_cursor
+from service.scheduler import next_review
 from service.schemas import (
     AnswerInResponse,
     AnswerRequest,
+    AnswersSubmitRequest,
+    AnswersSubmitResponse,
     AnswerSubmitRequest,
+    BulkQuestionItem,
+    GradedAnswerResponse,
     IsCorrectAnsResponse,
     QuestionAddRequest,
+    QuestionBulkRequest,
     QuestionListRequest,
     QuestionInQuizResponse,
+    RoundAnswerRequest,
+    RoundAnswerResponse,
 )
 
 
@@ -29,16 +43,85 @@ class QuestionsManager:
     #     vals = data.model_dump()
     #     return await QuestionDb(self.session).add_question(vals)
 
+    async def add_questions_bulk(self, data: QuestionBulkRequest) -> dict:
+        """Valid items are inserted (two multi-row inserts), others skipped"""
+        results = [{"index": i} for i in range(len(data.questions))]
+        valid: list[tuple[dict, BulkQuestionItem]] = []
+        for result, raw in zip(results, data.questions, strict=True):
+            try:
+                item = BulkQuestionItem.model_validate(raw)
+            except ValidationError as err:
+                result["error"] = "; ".join(
+                    "{}: {}".format(".".join(map(str, e["loc"])), e["msg"])
+                    for e in err.errors()
+                )
+                continue
+            if item.answers and not any(a.correct for a in item.answers):
+                result["error"] = "answers: no correct answer"
+                continue
+            valid.append((result, item))
+
+        question_ids = await QuestionDb(self.session).add_questions(
+            [item.model_dump(exclude={"answers"}) for _, item in valid]
+        )
+        answer_rows = []
+        for (result, item), question_id in zip(
+            valid, question_ids, strict=True
+        ):
+            result["id"] = question_id
+            answer_rows.extend(
+                {**answer.model_dump(), "question_id": question_id}
+                for answer in item.answers
+            )
+        if answer_rows:
+            answer_ids = iter(
+                await AnswerDb(self.session).add_answers(answer_rows)
+            )
+            for result, item in valid:
+                result["answer_ids"] = [next(answer_ids) for _ in item.answers]
+        return {"created": len(question_ids), "items": results}
+
     async def remove_question(self, id_: int):
+        catalog.invalidate_on_commit(self.session, id_)
+        answer_keys.invalidate_on_commit(self.session, id_)
         return await QuestionDb(self.session).remove_question(id_)
 
     async def edit_question_by_id(self, vals: dict) -> int:
         id_ = vals.pop("id")
+        catalog.invalidate_on_commit(self.session, id_)
         res = await QuestionDb(self.session).edit_question_by_id(id_, vals)
         return res.id if res else None
 
+    async def get_question_with_answers(self, id_: int) -> QuestionDto | None:
+        """Question with all its answers, active ones are cached"""
+        question = catalog.get(id_)
+        if question is None:
+            since = catalog.generation()
+            question = await QuestionDb(
+                self.session
+            ).get_question_with_answers(id_)
+            if question:
+                catalog.put(question, since, self.session)
+        return question
+
     async def find_correct_answers(self, question_id: int) -> list[AnswerDto]:
-        return await QuestionDb(self.session).find_correct_answers(question_id)
+        question = await self.get_question_with_answers(question_id)
+        if question is None:
+            return []
+        return [ans for ans in question.answers if ans.correct]
+
+    async def get_answer_key(self, question_id: int) -> AnswerKey | None:
+        """From the in-memory index, the db on a miss"""
+        key = answer_keys.get(question_id)
+        if key is None:
+            since = answer_keys.generation()
+            rows = await AnswerDb(self.session).correct_answer_rows(
+                [question_id]
+            )
+            key = build_keys(rows).get(question_id)
+            if key is not None:
+                answer_keys.put(question_id, key, since, self.session)
+        return key
 
     async def compare_correct_answers(
         self, params: AnswerSubmitRequest
@@ -46,30 +129,87 @@ class QuestionsManager:
         question_id, user_ans_ids = params.question_id, params.answer_ids
         if not user_ans_ids:
             return None
-        corr_answers = await QuestionDb(self.session).find_correct_answers(
-            question_id
-        )
-        if not corr_answers:
+        key = await self.get_answer_key(question_id)
+        if key is None:
             return None
-        is_correct = sorted([r.id for r in corr_answers]) == sorted(
-            user_ans_ids
+        return self.graded(key, user_ans_ids)
+
+    async def get_answer_keys(
+        self, question_ids: list[int]
+    ) -> dict[int, AnswerKey]:
+        """From the index, the misses with one `IN (...)` query"""
+        keys, missing = {}, []
+        for question_id in dict.fromkeys(question_ids):
+            key = answer_keys.get(question_id)
+            if key is None:
+                missing.append(question_id)
+            else:
+                keys[question_id] = key
+        if missing:
+            since = answer_keys.generation()
+            rows = await AnswerDb(self.session).correct_answer_rows(missing)
+            for question_id, key in build_keys(rows).items():
+                answer_keys.put(question_id, key, since, self.session)
+                keys[question_id] = key
+        return keys
+
+    async def grade_answers(
+        self, data: AnswersSubmitRequest
+    ) -> AnswersSubmitResponse:
+        keys = await self.get_answer_keys(
+            [item.question_id for item in data.answers]
         )
+        results = []
+        for item in data.answers:
+            key = keys.get(item.question_id)
+            if key is None or not item.answer_ids:
+                results.append(
+                    GradedAnswerResponse(
+                        question_id=item.question_id, correct=None
+                    )
+                )
+                continue
+            graded = self.graded(key, item.answer_ids)
+            results.append(
+                GradedAnswerResponse(
+                    question_id=item.question_id,
+                    correct=graded.correct,
+                    answers=graded.answers,
+                )
+            )
+        return AnswersSubmitResponse(
+            total=len(results),
+            correct=sum(1 for res in results if res.correct),
+            results=results,
+        )
+
+    @staticmethod
+    def graded(key: AnswerKey, answer_ids: list[int]) -> IsCorrectAnsResponse:
         return IsCorrectAnsResponse(
-            correct=is_correct,
+            correct=key.grade(answer_ids),
             answers=[
-                AnswerInResponse(id=ans.id, text=ans.text, correct=ans.correct)
-                for ans in corr_answers
+                AnswerInResponse(id=id_, text=text, correct=True)
+                for id_, text in key.texts
             ],
         )
 
     async def get_question_by_id(self, id_: int) -> QuestionDto | None:
-        return await QuestionDb(self.session).get_question_by_id(id_)
+        return await self.get_question_with_answers(id_)
 
     async def get_questions(
         self, data: QuestionListRequest
     ) -> list[QuestionDto]:
         return await QuestionDb(self.session).get_questions(data)
 
+    async def get_questions_page(
+        self, data: QuestionListRequest
+    ) -> tuple[list[QuestionDto], str | None]:
+        """Questions and the cursor of the next page"""
+        res = await QuestionDb(self.session).get_questions(data)
+        # without a limit everything is on this page
+        last_page = data.limit is None or len(res) < data.limit
+        return res, next_cursor(data.order, res, last_page)
+
     def convert_quiz_response(self, res) -> dict:
         responses = {}
         for question in res:
@@ -92,9 +232,41 @@ class QuestionsManager:
     async def get_questions_with_answers(
         self, data: QuestionListRequest
     ) -> dict:
+        responses, _ = await self.get_quiz_page(data)
+        return responses
+
+    async def get_quiz_page(
+        self, data: QuestionListRequest
+    ) -> tuple[dict, str | None]:
+        """Quiz and the cursor of the next page.
+
+        limit counts (question, answer) rows here, so only an empty page
+        is known to be the last one.
+        """
+        if self.is_single_question(data):
+            question = await self.get_question_with_answers(data.question_id)
+            res = [question] if self.in_quiz(question, data) else []
+            return self.convert_quiz_response(res), None
         res = await QuestionDb(self.session).get_questions_with_answers(data)
         responses = self.convert_quiz_response(res)
-        return responses
+        return responses, next_cursor(data.order, res, last_page=not res)
+
+    @staticmethod
+    def is_single_question(data: QuestionListRequest) -> bool:
+        """Page of one question by id (bot asks this way), catalog can serve"""
+        return bool(
+            data.question_id
+            and not data.text
+            and not data.cursor
+            and not data.offset
+            and data.limit
+        )
+
+    @staticmethod
+    def in_quiz(question: QuestionDto | None, data: QuestionListRequest):
+        return bool(
+            question and question.answers and question.active == data.active
+        )
 
 
 class AnswersManager:
@@ -105,6 +277,8 @@ class AnswersManager:
 
     async def add_answer(self, data: AnswerRequest):
         vals = data.model_dump()
+        catalog.invalidate_on_commit(self.session, data.question_id)
+        answer_keys.invalidate_on_commit(self.session, data.question_id)
         try:
             res = await AnswerDb(self.session).add_answer(vals)
         except IntegrityError as err:
@@ -113,6 +287,10 @@ class AnswersManager:
         return res  # res[0].id if res else None
 
     async def remove_answer(self, id_: int):
+        answer = await AnswerDb(self.session).get_answer_by_id(id_)
+        if answer:
+            catalog.invalidate_on_commit(self.session, answer.question_id)
+            answer_keys.invalidate_on_commit(self.session, answer.question_id)
         return await AnswerDb(self.session).remove_answer(id_)
 
     async def get_answer_by_id(self, ans_id: int) -> AnswerDto | None:
@@ -126,10 +304,137 @@ class AnswersManager:
         )
 
 
-"""
 class GameManager:
     session = None
 
     def __init__(self, session: AsyncSession) -> None:
         self.session = session
-"""
+
+    async def raise_score(self, tg_id: int) -> int | None:
+        score = await GameDb(self.session).raise_score(tg_id)
+        leaderboard.score_raised_on_commit(self.session, score)
+        return score
+
+    async def rank_of_score(self, score: int) -> int:
+        rank = leaderboard.rank(score)
+        if rank is None:  # not loaded yet
+            above = await GameDb(self.session).count_players_above(score)
+            rank = above + 1
+        return rank
+
+    async def ranked(self, players: list[tuple[int, int]]) -> dict:
+        ranks = {}
+        for _, score in players:
+            if score not in ranks:
+                ranks[score] = await self.rank_of_score(score)
+        return {
+            "players": [
+                {"tg_id": tg_id, "score": score, "rank": ranks[score]}
+                for tg_id, score in players
+            ],
+            "total": leaderboard.players,
+        }
+
+    async def top_players(self, limit: int) -> dict:
+        players = await GameDb(self.session).top_players(limit)
+        return await self.ranked(players)
+
+    async def player_rank(self, tg_id: int) -> dict | None:
+        score = await GameDb(self.session).get_score_of_player(tg_id)
+        if score is None:
+            return None
+        rank = await self.rank_of_score(score)
+        return {"tg_id": tg_id, "score": score, "rank": rank}
+
+    async def players_around(self, tg_id: int, amount: int) -> dict | None:
+        db_game = GameDb(self.session)
+        score = await db_game.get_score_of_player(tg_id)
+        if score is None:
+            return None
+        players = await db_game.players_around(tg_id, score, amount)
+        return await self.ranked(players)
+
+    async def create_new_rounds(self, tg_id: int) -> int:
+        """Due and unanswered questions.
+
+        When there are none, asked rounds are dropped (and the answered
+        bitmap too if the player answered the whole bank), then questions
+        which aren't due yet are taken.
+        """
+        db_game = GameDb(self.session)
+        created = await db_game.create_new_rounds(tg_id)
+        if not created:
+            if not await db_game.has_unanswered(tg_id):
+                await db_game.reset_answered(tg_id)
+            await db_game.delete_old_rounds(tg_id)
+            created = await db_game.create_new_rounds(tg_id)
+        if not created:
+            created = await db_game.create_new_rounds(tg_id, review_ahead=True)
+        return created
+
+    async def record_review(
+        self, tg_id: int, question_id: int, correct: bool
+    ) -> None:
+        """Reschedule the question for the player after an answer"""
+        db_game = GameDb(self.session)
+        now = utcnow()
+        schedule = await db_game.get_schedule(tg_id, question_id)
+        if schedule is None:
+            schedule = ScheduleDto(
+                player_id=tg_id, question_id=question_id, due=now
+            )
+        await db_game.save_schedule(next_review(schedule, correct, now))
+
+    async def next_round(self, tg_id: int) -> QuestionInQuizResponse | None:
+        """Next question of the player with answers, new rounds if needed.
+
+        Decks are refilled in the background, so the rounds are usually
+        there already.
+        """
+        deck_builder.touch(tg_id)
+        db_game = GameDb(self.session)
+        since = catalog.generation()
+        question = await db_game.get_next_question(tg_id)
+        if question is None:
+            await self.create_new_rounds(tg_id)
+            question = await db_game.get_next_question(tg_id)
+        if question is None:
+            return None
+        catalog.put(question, since, self.session)
+        responses = QuestionsManager(self.session).convert_quiz_response(
+            [question]
+        )
+        return responses[question.id]
+
+    async def answer_and_advance(
+        self, data: RoundAnswerRequest
+    ) -> RoundAnswerResponse | None:
+        """Grade the answer, close the round, give the next one.
+
+        Only the request which closes the round scores and reschedules
+        it, a repeated or concurrent answer gets the current score.
+        """
+        graded = await QuestionsManager(self.session).compare_correct_answers(
+            AnswerSubmitRequest(
+                question_id=data.question_id, answer_ids=data.answer_ids
+            )
+        )
+        if graded is None:
+            return None
+        db_game = GameDb(self.session)
+        closed = await db_game.close_round(data.question_id, data.tg_id)
+        if closed and graded.correct:
+            score = await self.raise_score(data.tg_id)
+        else:
+            score = await db_game.get_score_of_player(data.tg_id)
+        if closed:
+            await db_game.mark_answered_bit(data.question_id, data.tg_id)
+            await self.record_review(
+                data.tg_id, data.question_id, graded.correct
+            )
+        return RoundAnswerResponse(
+            correct=graded.correct,
+            answers=graded.answers,
+            score=score,
+            next_question=await self.next_round(data.tg_id),
+        )
@@ -1,28 +1,53 @@
+import asyncio
 import json
 import os
+import re
 
 import aiohttp
 
+from service.schemas import QuestionInQuizResponse
+from telegram_service.callback_token import (
+    SignedChoice,
+    is_token,
+    read_choice,
+)
+from telegram_service.http_client import http_client
 from telegram_service.process import (
     CallHandlersQuizGame,
     CallHandlersTg,
 )
 from telegram_service.schemas_tg import MessageInCallbackDto, MessageInTextDto
-from telegram_service.tg_config import logger
+from telegram_service.sender import BROADCAST, GAME, SendScheduler
+from telegram_service.tg_config import (
+    POLL_RETRY_DELAY,
+    POLL_TIMEOUT,
+    TG_OFFSET_SAVE_EVERY,
+    TG_OFFSET_SAVE_INTERVAL,
+    logger,
+)
 
 token = os.environ.get("TELEGRAM_BOT_API_TOKEN")
 assert token
 
+OPTION_LINE = re.compile(r"^(\d+): (.*)$", re.MULTILINE)
+
 
 class TgWorkQueue:
     token = token
 
+    def __init__(self):
+        # results of locally graded clicks being sent to the service
+        self.reports: set[asyncio.Task] = set()
+        self.sender = SendScheduler(self.post_tg_message)
+
     async def process(self, message):
         if "callback_query" in message:
             message_dto = MessageInCallbackDto(
                 chat_id=message["callback_query"]["message"]["chat"]["id"],
                 callback_data=message["callback_query"]["data"],
-                # text=message["callback_query"]["message"]["text"]
+                message_text=message["callback_query"]["message"].get(
+                    "text", ""
+                ),
             )
             await self.process_callback(message_dto)
         else:
@@ -32,7 +57,7 @@ class TgWorkQueue:
                 chat_id=message["message"]["chat"]["id"],
                 text_input=message["message"]["text"],
             )
-            if message_dto.text_input in ("/start", "/score"):
+            if message_dto.text_input in ("/start", "/score", "/top"):
                 await self.process_commands(message_dto)
             elif message_dto.text_input == "test":
                 await self.send_test_keyboard(message_dto.chat_id)
@@ -45,6 +70,8 @@ class TgWorkQueue:
             await self.process_command_start(message)
         elif text_input == "/score":
             await self.process_command_score(message)
+        elif text_input == "/top":
+            await self.process_command_top(message)
 
     async def process_command_start(self, message: MessageInTextDto):
         quiz_manager = CallHandlersQuizGame()
@@ -54,7 +81,8 @@ class TgWorkQueue:
             "It sends questions (without a stop).\n\n"
             "Choose a correct translation of the skipped word "
             "(marked as '___'). \n\n"
-            "You can also check you score typing '/score'."
+            "You can also check you score typing '/score' "
+            "and the best players typing '/top'."
         )
         await self.send_reply(message.chat_id, start_text)
         await self.next_round(message.chat_id)
@@ -64,12 +92,27 @@ class TgWorkQueue:
         score_text = await quiz_manager.get_score_of_player(message.chat_id)
         await self.send_reply(message.chat_id, score_text)
 
+    async def process_command_top(self, message: MessageInTextDto):
+        quiz_manager = CallHandlersQuizGame()
+        top_text = await quiz_manager.get_top(message.chat_id)
+        await self.send_reply(message.chat_id, top_text)
+
     async def next_round(self, chat_id: int):
         quiz_manager = CallHandlersQuizGame()
         next_question = await quiz_manager.next_question_with_ans_opts(chat_id)
+        await self.send_question(chat_id, next_question, quiz_manager)
+
+    async def send_question(
+        self,
+        chat_id: int,
+        next_question: QuestionInQuizResponse | None,
+        quiz_manager: CallHandlersQuizGame,
+    ):
         if not next_question:
             return
-        quiz_out = await quiz_manager.transform_to_text_and_btns(next_question)
+        quiz_out = await quiz_manager.transform_to_text_and_btns(
+            next_question, chat_id
+        )
         await self.send_reply_keyboard(
             chat_id=chat_id,
             text=quiz_out.question,
@@ -78,40 +121,92 @@ class TgWorkQueue:
 
     async def process_callback(self, message: MessageInCallbackDto):
         """User clicked on an inline keyboard button"""
+        if is_token(message.callback_data):
+            choice = read_choice(message.chat_id, message.callback_data)
+            if choice is None:
+                logger.warning("bad callback token from %s", message.chat_id)
+                return
+            await self.grade_locally(message, choice)
+            return
         callback_data = json.loads(message.callback_data)
         question_id = callback_data.get("question_id")
         answer = int(callback_data.get("choice"))
         quiz_manager = CallHandlersQuizGame()
         if question_id:
-            iscorrect = await quiz_manager.check_round_answer(
-                question_id, ans=[answer]
+            res = await quiz_manager.answer_round(
+                message.chat_id, question_id, ans=[answer]
             )
-            if not iscorrect:
+            if not res:
                 return
             text_reply_ans = (
                 "correct shall be: "
                 + "\n".join(
-                    [
-                        ans.text
-                        for ans in iscorrect.answers
-                        if ans.correct is True
-                    ]
+                    [ans.text for ans in res.answers if ans.correct is True]
                 )
-                if not iscorrect.correct
-                else f"correct: {iscorrect.correct}"
+                if not res.correct
+                else f"correct: {res.correct}"
             )
             await self.send_reply(message.chat_id, text_reply_ans)
-            if iscorrect.correct:
-                await self.increase_score(message, quiz_manager)
-            await quiz_manager.mark_question_answered(
-                question_id, message.chat_id
+            if res.correct:
+                await self.congratulate_score(message, res.score)
+            await self.send_question(
+                message.chat_id, res.next_question, quiz_manager
+            )
+
+    async def grade_locally(
+        self, message: MessageInCallbackDto, choice: SignedChoice
+    ):
+        """Reply from the signed token, report to the service in background"""
+        if choice.correct:
+            text_reply_ans = "correct: True"
+        else:
+            options = dict(OPTION_LINE.findall(message.message_text))
+            text_reply_ans = "correct shall be: " + "\n".join(
+                options.get(str(opt), "?") for opt in choice.correct_options
+            )
+        await self.send_reply(message.chat_id, text_reply_ans)
+        task = asyncio.create_task(self.report_round(message, choice))
+        self.reports.add(task)
+        task.add_done_callback(self.reports.discard)
+
+    async def stop(self, grace: float = 10) -> None:
+        """Wait up to `grace` s for click reports, then stop the sender"""
+        if self.reports:
+            _, pending = await asyncio.wait(self.reports, timeout=grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self.sender.stop(grace)
+
+    async def report_round(
+        self, message: MessageInCallbackDto, choice: SignedChoice
+    ):
+        """Score the answer and send the next question"""
+        quiz_manager = CallHandlersQuizGame()
+        try:
+            res = await quiz_manager.answer_round(
+                message.chat_id, choice.question_id, ans=[choice.answer_id]
             )
-            await self.next_round(message.chat_id)
+            if not res:
+                return
+            if res.correct != choice.correct:
+                logger.warning(
+                    "question %s: bot graded %s, service %s",
+                    choice.question_id,
+                    choice.correct,
+                    res.correct,
+                )
+            if res.correct:
+                await self.congratulate_score(message, res.score)
+            await self.send_question(
+                message.chat_id, res.next_question, quiz_manager
+            )
+        except Exception as exc:
+            logger.error("round not reported", exc_info=exc)
 
-    async def increase_score(
-        self, message: MessageInCallbackDto, quiz_manager: CallHandlersQuizGame
+    async def congratulate_score(
+        self, message: MessageInCallbackDto, score: int | None
     ) -> None:
-        score = await quiz_manager.edit_score_of_player(message.chat_id)
         if isinstance(score, int) and score % 5 == 0:
             score_text = f"Your score is {score}!"
             await self.send_reply(message.chat_id, score_text)
@@ -151,63 +246,118 @@ class TgWorkQueue:
         }
         return await self.send_tg_message(data)
 
-    async def send_tg_message(self, data: dict):
+    async def broadcast(self, chat_ids: list[int], text: str):
+        """After the game replies waiting to be sent"""
+        return await asyncio.gather(
+            *(
+                self.send_tg_message(
+                    {"chat_id": chat_id, "text": text}, priority=BROADCAST
+                )
+                for chat_id in chat_ids
+            )
+        )
+
+    async def send_tg_message(
+        self, data: dict, priority: int = GAME
+    ) -> dict | None:
+        """Through the rate limiting sender, None if not sent"""
+        return await self.sender.send(data, priority)
+
+    async def post_tg_message(self, data: dict) -> tuple[int, dict]:
         url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-        async with aiohttp.ClientSession() as client:
-            async with client.post(url, data=data) as resp:
-                if resp.status != 200:
-                    try:
-                        err = json.loads(resp.content._buffer[0])[
-                            "description"
-                        ]
-                        logger.error("tg error %s", err, exc_info=1)
-                    except Exception as exc:
-                        logger.error("tg error", exc_info=exc)
-                        return None
-                return resp
+        async with http_client.session.post(url, data=data) as resp:
+            try:
+                body = await resp.json()
+            except (aiohttp.ContentTypeError, ValueError):
+                body = {"description": await resp.text()}
+            return resp.status, body
 
 
 class TgPullQueue:
+    """Long polling of getUpdates with the offset kept in memory.
+
+    The offset is read from the service once and saved back in the
+    background every TG_OFFSET_SAVE_EVERY updates or
+    TG_OFFSET_SAVE_INTERVAL seconds, so after a crash at most that many
+    updates are handled again.
+    """
+
     token = token
-    offset = 0
 
     def __init__(self):
-        self.offset = 0
+        self.offset: int | None = None  # next update_id to ask for
+        self.saved_offset: int | None = None
+        self.unsaved = 0
+        self._saving: asyncio.Task | None = None
 
     async def get_tg_updates(self, method_name="getUpdates"):
         """Proceed not files"""
         url = f"https://api.telegram.org/bot{self.token}/{method_name}"
         params = {
             "offset": self.offset,
-            "timeout": 30,
+            "timeout": POLL_TIMEOUT,
             "allowed_updates": [],
             # "message", "inline_query", "callback_query"
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url, data=params, headers={"Content-Type": "application/json"}
-            ) as resp:
-                json_resp = await resp.json()
-                logger.info(json.dumps(json_resp))
-                if not json_resp["ok"]:
-                    logger.error(
-                        "json not ok %s", json.dumps(json_resp), exc_info=1
-                    )
-                messages = json_resp["result"]
-                return messages
+        async with http_client.session.post(
+            url,
+            data=params,
+            headers={"Content-Type": "application/json"},
+            timeout=aiohttp.ClientTimeout(total=POLL_TIMEOUT + 10),
+        ) as resp:
+            json_resp = await resp.json()
+            logger.info(json.dumps(json_resp))
+        if not json_resp.get("ok"):
+            # e.g. 409 while a webhook is set, don't hammer telegram
+            logger.error(
+                "%s failed %s: %s",
+                method_name,
+                json_resp.get("error_code"),
+                json_resp.get("description"),
+            )
+            await asyncio.sleep(
+                json_resp.get("parameters", {}).get(
+                    "retry_after", POLL_RETRY_DELAY
+                )
+            )
+            return []
+        return json_resp["result"]
 
     async def get_new_messages(self):
-        last_id = await CallHandlersTg().get_last_tg_id()
-        self.offset = last_id + 1
+        if self.offset is None:
+            last_id = await CallHandlersTg().get_last_tg_id()
+            self.offset = self.saved_offset = (last_id or 0) + 1
         messages = await self.get_tg_updates()
 
-        new_mess = []
-        for message in messages:
-            if message["update_id"] >= self.offset:
-                new_mess.append(message)
-                self.offset = messages[-1]["update_id"]
+        new_mess = [m for m in messages if m["update_id"] >= self.offset]
         if new_mess:
-            await CallHandlersTg().update_tg_id(messages[-1]["update_id"])
-            self.offset = messages[-1]["update_id"] + 1
+            self.offset = new_mess[-1]["update_id"] + 1
+            self.unsaved += len(new_mess)
+            if self.unsaved >= TG_OFFSET_SAVE_EVERY:
+                self.save_offset_soon()
         return new_mess
+
+    def save_offset_soon(self) -> None:
+        if self._saving is None or self._saving.done():
+            self._saving = asyncio.create_task(self.save_offset())
+
+    async def save_offset(self) -> None:
+        offset = self.offset
+        if offset is None or offset == self.saved_offset:
+            return
+        self.unsaved = 0
+        try:
+            res = await CallHandlersTg().update_tg_id(offset - 1)
+        except (aiohttp.ClientError, TimeoutError) as exc:
+            logger.warning("offset not saved: %s", exc)
+            return
+        if res is not None:
+            self.saved_offset = offset
+
+    async def save_offset_forever(
+        self, interval: float = TG_OFFSET_SAVE_INTERVAL
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            self.save_offset_soon()
@@ -0,0 +1,84 @@
+"""Signed grading tokens in `callback_data` of the answer buttons.
+
+A token says which answer the button is and which options of the
+message are correct, so the bot grades a click without asking the
+service. It's signed with KEY (and bound to the chat) so a forged
+callback can't claim a correct answer:
+
+    g:<question_id>:<answer_id>:<option>:<correct options>:<signature>
+
+Telegram allows at most 64 bytes of `callback_data`.
+"""
+
+import base64
+import hashlib
+import hmac
+from dataclasses import dataclass
+
+from telegram_service.tg_config import CALLBACK_SIGN_KEY
+
+CALLBACK_DATA_MAX = 64
+PREFIX = "g"
+SIGNATURE_BYTES = 8
+
+
+@dataclass(frozen=True)
+class SignedChoice:
+    question_id: int
+    answer_id: int
+    option: int  # 1-based position of the answer in the message
+    correct_options: tuple[int, ...]
+
+    @property
+    def correct(self) -> bool:
+        """The clicked option is the only correct one"""
+        return self.correct_options == (self.option,)
+
+
+def _signature(chat_id: int, payload: str) -> str:
+    digest = hmac.new(
+        CALLBACK_SIGN_KEY.encode(),
+        f"{chat_id}:{payload}".encode(),
+        hashlib.sha256,
+    ).digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def sign_choice(
+    chat_id: int,
+    question_id: int,
+    answer_id: int,
+    option: int,
+    correct_options: list[int],
+) -> str:
+    if any(not 0 < opt < 10 for opt in [option, *correct_options]):
+        raise ValueError(f"options are one digit: {correct_options}")
+    options = "".join(str(opt) for opt in correct_options)
+    payload = f"{PREFIX}:{question_id}:{answer_id}:{option}:{options}"
+    token = f"{payload}:{_signature(chat_id, payload)}"
+    if len(token.encode()) > CALLBACK_DATA_MAX:
+        raise ValueError(f"callback token is too long: {token}")
+    return token
+
+
+def is_token(data: str) -> bool:
+    return data.startswith(PREFIX + ":")
+
+
+def read_choice(chat_id: int, data: str) -> SignedChoice | None:
+    """None if `data` isn't a token or its signature is wrong"""
+    if not is_token(data):
+        return None
+    payload, _, signature = data.rpartition(":")
+    if not hmac.compare_digest(signature, _signature(chat_id, payload)):
+        return None
+    try:
+        _, question_id, answer_id, option, options = payload.split(":")
+        return SignedChoice(
+            question_id=int(question_id),
+            answer_id=int(answer_id),
+            option=int(option),
+            correct_options=tuple(int(opt) for opt in options),
+        )
+    except ValueError:
+        return None
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from telegram_service.tg_config import (
+    TG_STATS_INTERVAL,
+    TG_WORKER_QUEUE,
+    TG_WORKERS,
+    logger,
+    stats_logger,
+)
+
+
+def chat_id_of(update: dict) -> int:
+    """Chat of a message or of a clicked keyboard, update_id otherwise"""
+    if "callback_query" in update:
+        return update["callback_query"]["message"]["chat"]["id"]
+    if "message" in update:
+        return update["message"]["chat"]["id"]
+    return update.get("update_id", 0)
+
+
+class Dispatcher:
+    """Fans updates out to a fixed pool of workers keyed by chat_id.
+
+    Each worker has a bounded FIFO queue and a chat always goes to the
+    same worker, so updates of a chat are handled in order while other
+    chats go on in parallel. A full queue makes `dispatch` wait, which
+    stops polling until the workers catch up.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[dict], Awaitable[None]],
+        workers: int = TG_WORKERS,
+        queue_size: int = TG_WORKER_QUEUE,
+    ):
+        self.handle = handle
+        self.queues: list[asyncio.Queue] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(workers)
+        ]
+        self.tasks: list[asyncio.Task] = []
+        self.dispatched = 0
+        self.processed = 0
+        self.errors = 0
+        self.blocked = 0  # dispatches which waited for a full queue
+        self.blocked_s = 0.0
+        self.rejected = 0  # by try_dispatch
+        self.max_depth = 0
+
+    def start(self) -> None:
+        self.tasks = [
+            asyncio.create_task(self._work(queue)) for queue in self.queues
+        ]
+
+    def queue_of(self, update: dict) -> asyncio.Queue:
+        return self.queues[hash(chat_id_of(update)) % len(self.queues)]
+
+    async def dispatch(self, update: dict) -> None:
+        queue = self.queue_of(update)
+        if queue.full():
+            self.blocked += 1
+            started = time.perf_counter()
+            await queue.put(update)
+            self.blocked_s += time.perf_counter() - started
+        else:
+            queue.put_nowait(update)
+        self.dispatched += 1
+        self.max_depth = max(self.max_depth, queue.qsize())
+
+    def try_dispatch(self, update: dict) -> bool:
+        """Without waiting, False if the chat's queue is full"""
+        queue = self.queue_of(update)
+        try:
+            queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.dispatched += 1
+        self.max_depth = max(self.max_depth, queue.qsize())
+        return True
+
+    async def _work(self, queue: asyncio.Queue) -> None:
+        while True:
+            update = await queue.get()
+            try:
+                await self.handle(update)
+                self.processed += 1
+            except Exception as exc:
+                self.errors += 1
+                logger.error("update not processed", exc_info=exc)
+            finally:
+                queue.task_done()
+
+    async def stop(self, grace: float = 10) -> None:
+        """Cancel the workers, waiting up to `grace` s for queued updates"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self.queues)),
+                grace,
+            )
+        except TimeoutError:
+            logger.warning("dropped %s queued updates", self.stats()["depth"])
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def log_stats_forever(
+        self, interval: float = TG_STATS_INTERVAL
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            stats_logger.info("dispatcher %s", self.stats())
+
+    def stats(self) -> dict:
+        depths = [queue.qsize() for queue in self.queues]
+        return {
+            "workers": len(self.queues),
+            "queue_size": self.queues[0].maxsize,
+            "depth": sum(depths),
+            "busiest_depth": max(depths),
+            "max_depth": self.max_depth,
+            "dispatched": self.dispatched,
+            "processed": self.processed,
+            "errors": self.errors,
+            "blocked": self.blocked,
+            "blocked_s": round(self.blocked_s, 3),
+            "rejected": self.rejected,
+        }
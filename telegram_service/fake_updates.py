@@ -0,0 +1,16 @@
+"""Made up Telegram updates for the webhook tests and benchmarks"""
+
+
+def sample_updates(chats: int, amount: int, text: str = "/score") -> list:
+    """Text messages of `chats` chats round-robin, update_id ascending"""
+    return [
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "chat": {"id": 1000 + update_id % chats, "type": "private"},
+                "text": text,
+            },
+        }
+        for update_id in range(1, amount + 1)
+    ]
@@ -0,0 +1,57 @@
+import aiohttp
+
+from telegram_service.tg_config import http_settings
+
+
+class HttpClient:
+    """One aiohttp session for the process, keep-alive pools per host.
+
+    Started and closed by `telegram_main`. Scripts calling the handlers
+    outside of it get the session opened lazily and close it themselves.
+    """
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+
+    def _open(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=http_settings["limit"],
+            limit_per_host=http_settings["limit_per_host"],
+            keepalive_timeout=http_settings["keepalive"],
+            ttl_dns_cache=http_settings["dns_cache"],
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(
+                total=http_settings["timeout"],
+                sock_connect=http_settings["connect_timeout"],
+            ),
+        )
+
+    def _ensure_open(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = self._open()
+        return self._session
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Must be used inside a running event loop"""
+        return self._ensure_open()
+
+    async def start(self) -> None:
+        self._ensure_open()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+http_client = HttpClient()
@@ -1,73 +1,88 @@
 # import asyncio
 import json
+from collections.abc import AsyncIterator
 from random import shuffle
 from urllib.parse import urlencode
 
-import aiohttp
-
 from service.schemas import (
     IsCorrectAnsResponse,
+    LeaderboardEntry,
+    LeaderboardResponse,
     QuestionAddResponse,
+    QuestionBulkResponse,
     QuestionResponse,
     QuestionInQuizResponse,
     QuizResponse,
+    RoundAnswerResponse,
     ScoreResponse,
 )
+from telegram_service.callback_token import sign_choice
+from telegram_service.http_client import http_client
 from telegram_service.schemas_tg import QuizOutDto
-from telegram_service.tg_config import URL_START, logger
+from telegram_service.tg_config import LOCAL_GRADING, URL_START, logger
 
 
 class CallHandlersBase:
     async def load_json_post_handler(self, url, data=None):
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url, data=data, headers={"Content-Type": "application/json"}
-            ) as resp:
-                if resp.status not in (200, 201):
-                    try:
-                        logger.error(await resp.json())
-                    except Exception:
-                        ...
-                    return None
-                json_resp = await resp.json()
-                logger.info(json_resp)
-                return json_resp
+        async with http_client.session.post(
+            url, data=data, headers={"Content-Type": "application/json"}
+        ) as resp:
+            if resp.status not in (200, 201):
+                try:
+                    logger.error(await resp.json())
+                except Exception:
+                    ...
+                return None
+            json_resp = await resp.json()
+            logger.info(json_resp)
+            return json_resp
 
     async def load_json_put_handler(self, url, data=None):
-        async with aiohttp.ClientSession() as session:
-            async with session.put(
-                url, data=data, headers={"Content-Type": "application/json"}
-            ) as resp:
-                if resp.status not in (200, 201):
-                    logger.error(await resp.json())
-                    return None
-                json_resp = await resp.json()
-                logger.info(json_resp)
-                return json_resp
+        async with http_client.session.put(
+            url, data=data, headers={"Content-Type": "application/json"}
+        ) as resp:
+            if resp.status not in (200, 201):
+                logger.error(await resp.json())
+                return None
+            json_resp = await resp.json()
+            logger.info(json_resp)
+            return json_resp
 
     async def load_json_delete_handler(self, url, kwargs=None):
-        async with aiohttp.ClientSession() as session:
-            async with session.delete(
-                url,
-                # **kwargs,
-                headers={"Content-Type": "application/json"},
-            ) as resp:
-                if resp.status not in (200, 204):
-                    logger.error(await resp.json())
-                    return None
-                json_resp = await resp.json()
-                logger.info(json_resp)
-                return json_resp
+        async with http_client.session.delete(
+            url,
+            # **kwargs,
+            headers={"Content-Type": "application/json"},
+        ) as resp:
+            if resp.status not in (200, 204):
+                logger.error(await resp.json())
+                return None
+            json_resp = await resp.json()
+            logger.info(json_resp)
+            return json_resp
 
     async def load_json_get_handler(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as resp:
-                if resp.status != 200:
-                    logger.error(await resp.json())
-                    return None
-                json_resp = await resp.json()
-                logger.info(json_resp)
-                return json_resp
+        async with http_client.session.get(url) as resp:
+            if resp.status != 200:
+                logger.error(await resp.json())
+                return None
+            json_resp = await resp.json()
+            logger.info(json_resp)
+            return json_resp
+
+    async def load_json_page_handler(self, method, url, data=None):
+        """Json of a page and the cursor of the next one"""
+        async with http_client.session.request(
+            method,
+            url,
+            data=data,
+            headers={"Content-Type": "application/json"},
+        ) as resp:
+            if resp.status != 200:
+                logger.error(await resp.json())
+                return None, None
+            json_resp = await resp.json()
+            return json_resp, resp.headers.get("X-Next-Cursor")
 
 
 class CallHandlersTg(CallHandlersBase):
@@ -115,6 +130,38 @@ class CallHandlersQuizBulk(CallHandlersBase):
             return []
         return [QuestionResponse(**question) for question in questions]
 
+    async def walk_questions(
+        self, data: dict | None = None
+    ) -> AsyncIterator[QuestionResponse]:
+        """All questions of the bank, page by page (keyset cursor)"""
+        url = URL_START + "/v1/questions"
+        data = dict(data or {"active": 1, "limit": 50, "order": "id"})
+        data.pop("offset", None)
+        while True:
+            questions, cursor = await self.load_json_page_handler(
+                "POST", url, json.dumps(data)
+            )
+            for question in questions or []:
+                yield QuestionResponse(**question)
+            if not cursor:
+                return
+            data["cursor"] = cursor
+
+    async def walk_quiz(
+        self, data: dict | None = None
+    ) -> AsyncIterator[QuestionInQuizResponse]:
+        """All questions with answers, page by page (keyset cursor)"""
+        data = dict(data or {"active": 1, "limit": 50, "order": "id"})
+        data.pop("offset", None)
+        while True:
+            url = URL_START + "/v1/show-quiz?" + urlencode(data)
+            quiz, cursor = await self.load_json_page_handler("GET", url)
+            for question in QuizResponse(quiz or {}).root.values():
+                yield question
+            if not cursor:
+                return
+            data["cursor"] = cursor
+
 
 class CallHandlersQuizGame(CallHandlersBase):
     async def get_next_question(self, tg_id: int) -> QuestionResponse | None:
@@ -126,24 +173,20 @@ class CallHandlersQuizGame(CallHandlersBase):
     async def next_question_with_ans_opts(
         self, tg_id: int
     ) -> QuestionInQuizResponse | None:
-        url = URL_START + "/v1/round-question-id"
+        url = URL_START + "/v1/next-round"
         data = json.dumps({"tg_id": tg_id})
         res = await self.load_json_post_handler(url, data)
         if not res:
-            logger.info("not next question_id")
-            return None
-        question_id = res["question_id"]
-        data = res  # json.dumps(res)
-        questions_dict = await CallHandlersQuizBulk().load_quiz(data)
-        if not questions_dict:
+            logger.info("not next question")
             return None
-        question = questions_dict.root[question_id]
+        question = QuestionInQuizResponse(**res)
         shuffle(question.answers)
         return question
 
     async def transform_to_text_and_btns(
-        self, next_question: QuestionInQuizResponse
+        self, next_question: QuestionInQuizResponse, chat_id: int | None = None
     ) -> QuizOutDto:
+        """With LOCAL_GRADING and chat_id, buttons carry signed tokens"""
         text = (
             next_question.text
             + "\n"
@@ -154,12 +197,17 @@ class CallHandlersQuizGame(CallHandlersBase):
                 ]
             )
         )
+        correct_options = [
+            ind
+            for ind, ans in enumerate(next_question.answers, start=1)
+            if ans.correct
+        ]
         buttons = [
             [
                 {
                     "text": ind,
-                    "callback_data": json.dumps(
-                        {"question_id": next_question.id, "choice": ans.id}
+                    "callback_data": self.callback_data(
+                        chat_id, next_question.id, ans.id, ind, correct_options
                     ),
                 }
                 for ind, ans in enumerate(next_question.answers, start=1)
@@ -167,6 +215,23 @@ class CallHandlersQuizGame(CallHandlersBase):
         ]
         return QuizOutDto(question=text, buttons=buttons)
 
+    @staticmethod
+    def callback_data(
+        chat_id: int | None,
+        question_id: int,
+        answer_id: int,
+        option: int,
+        correct_options: list[int],
+    ) -> str:
+        if LOCAL_GRADING and chat_id is not None:
+            try:
+                return sign_choice(
+                    chat_id, question_id, answer_id, option, correct_options
+                )
+            except ValueError as exc:
+                logger.warning("not signed: %s", exc)
+        return json.dumps({"question_id": question_id, "choice": answer_id})
+
     async def edit_score_of_player(self, tg_id: int) -> int:
         url = URL_START + f"/v1/edit-score?tg_id={tg_id}"
         # data = json.dumps({"tg_id": tg_id})
@@ -182,6 +247,22 @@ class CallHandlersQuizGame(CallHandlersBase):
         )
         return "success" in res_dict
 
+    async def answer_round(
+        self, tg_id: int, question_id: int, ans: list[int]
+    ) -> RoundAnswerResponse | None:
+        """Grades, scores and gives the next question in one request"""
+        url = URL_START + "/v1/answer-round"
+        data = json.dumps(
+            {"tg_id": tg_id, "question_id": question_id, "answer_ids": ans}
+        )
+        res = await self.load_json_post_handler(url, data)
+        if not res:
+            return None
+        res = RoundAnswerResponse(**res)
+        if res.next_question:
+            shuffle(res.next_question.answers)
+        return res
+
     async def check_round_answer(
         self, question_id: int, ans: int
     ) -> IsCorrectAnsResponse | None:
@@ -207,6 +288,26 @@ class CallHandlersQuizGame(CallHandlersBase):
             else """can't check score..."""
         )
 
+    async def get_top(self, tg_id: int, limit: int = 10) -> str:
+        """Top players and the rank of this one"""
+        url = URL_START + "/v1/leaderboard/top?limit={}".format(limit)
+        res = await self.load_json_get_handler(url)
+        if not res:
+            return "can't check the leaderboard..."
+        top = LeaderboardResponse(**res)
+        lines = [
+            f"{player.rank}. {'you' if player.tg_id == tg_id else 'player'}"
+            f" - {player.score}"
+            for player in top.players
+        ]
+        if all(player.tg_id != tg_id for player in top.players):
+            url = URL_START + "/v1/leaderboard/rank?tg_id={}".format(tg_id)
+            res = await self.load_json_get_handler(url)
+            if res:
+                me = LeaderboardEntry(**res)
+                lines.append(f"...\n{me.rank}. you - {me.score}")
+        return "\n".join(lines)
+
 
 class CallHandlersAdminFunc(CallHandlersBase):
     async def add_question(self, data: dict):
@@ -220,6 +321,18 @@ class CallHandlersAdminFunc(CallHandlersBase):
         res = await self.load_json_post_handler(url, data)
         return QuestionAddResponse(**res) if res else None
 
+    async def add_questions_bulk(self, questions: list[dict]):
+        """questions_example = [{
+            "active": 1,
+            "text": "question",
+            "answers": [{"text": "answer", "correct": true}]
+        }]
+        """
+        url = URL_START + "/v1/questions:bulk"
+        data = json.dumps({"questions": questions})
+        res = await self.load_json_post_handler(url, data)
+        return QuestionBulkResponse(**res) if res else None
+
     async def edit_question(self, question_dto):
         question_id = question_dto.question_id
         corrected = question_dto.question
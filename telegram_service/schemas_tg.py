@@ -4,7 +4,8 @@ from dataclasses import dataclass
 @dataclass
 class MessageInCallbackDto:
     chat_id: int
-    callback_data: dict
+    callback_data: str
+    message_text: str = ""  # of the message with the keyboard
 
 
 @dataclass
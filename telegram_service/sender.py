@@ -0,0 +1,262 @@
+import asyncio
+import heapq
+import itertools
+import statistics
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from telegram_service.tg_config import (
+    TG_CHAT_BURST,
+    TG_CHAT_RATE,
+    TG_SEND_RATE,
+    TG_SEND_RETRIES,
+    TG_STATS_INTERVAL,
+    logger,
+    stats_logger,
+)
+
+# priorities of outgoing messages, lower goes first
+GAME = 0
+BROADCAST = 1
+
+CHAT_BUCKETS_MAX = 10_000  # idle full buckets are dropped above it
+RETRY_DELAY = 1  # after a network error, s
+
+
+class TokenBucket:
+    """`rate` tokens a second, at most `capacity` kept"""
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(now - self.updated, 0)
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is there"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+@dataclass(order=True)
+class OutMessage:
+    priority: int
+    seq: int
+    chat_id: int = field(compare=False)
+    data: dict = field(compare=False)
+    submitted: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    attempts: int = field(default=0, compare=False)
+
+
+class SendScheduler:
+    """Paces sendMessage calls under Telegram's limits.
+
+    A global token bucket (TG_SEND_RATE a second) and one per chat
+    (TG_CHAT_RATE, bursts of TG_CHAT_BURST). Game replies go before
+    broadcasts. A 429 or a network error holds the chat for
+    `retry_after` (RETRY_DELAY) and the message is sent again, up to
+    TG_SEND_RETRIES times.
+    """
+
+    def __init__(
+        self,
+        post: Callable[[dict], Awaitable[tuple[int, dict]]],
+        rate: float = TG_SEND_RATE,
+        chat_rate: float = TG_CHAT_RATE,
+        chat_burst: float = TG_CHAT_BURST,
+        retries: int = TG_SEND_RETRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.post = post
+        self.clock = clock
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.retries = retries
+        self.bucket = TokenBucket(rate, max(rate, 1), clock())
+        self.chat_buckets: dict[int, TokenBucket] = {}
+        self.chat_held: dict[int, float] = {}  # retry_after of a chat
+        self.ready: list[OutMessage] = []
+        self.delayed: list[tuple[float, OutMessage]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._sending: set[asyncio.Task] = set()
+        self._idle = asyncio.Event()  # nothing queued or being sent
+        self._idle.set()
+        self.latencies: deque[float] = deque(maxlen=1000)  # recent, s
+        self.sent = 0
+        self.rate_limited = 0
+        self.retried = 0
+        self.dropped = 0
+
+    def submit(self, data: dict, priority: int = GAME) -> asyncio.Future:
+        """Queue a message, the future gets the Telegram result or None"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        message = OutMessage(
+            priority=priority,
+            seq=next(self._seq),
+            chat_id=int(data["chat_id"]),
+            data=data,
+            submitted=self.clock(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        heapq.heappush(self.ready, message)
+        self._idle.clear()
+        self._wakeup.set()
+        return message.future
+
+    async def send(self, data: dict, priority: int = GAME) -> dict | None:
+        return await self.submit(data, priority)
+
+    def _chat_bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= CHAT_BUCKETS_MAX:
+                self.chat_buckets = {
+                    id_: b
+                    for id_, b in self.chat_buckets.items()
+                    if not b.full(now)
+                }
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _chat_wait(self, chat_id: int, now: float) -> float:
+        held = self.chat_held.get(chat_id, 0) - now
+        if held <= 0:
+            self.chat_held.pop(chat_id, None)
+        return max(held, self._chat_bucket(chat_id, now).delay(now))
+
+    async def _wait_wakeup(self, delay: float | None) -> None:
+        with suppress(TimeoutError):
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            now = self.clock()
+            while self.delayed and self.delayed[0][0] <= now:
+                heapq.heappush(self.ready, heapq.heappop(self.delayed)[1])
+            if not self.ready:
+                await self._wait_wakeup(
+                    self.delayed[0][0] - now if self.delayed else None
+                )
+                continue
+            global_wait = self.bucket.delay(now)
+            if global_wait > 0:
+                await asyncio.sleep(global_wait)
+                continue
+            message = heapq.heappop(self.ready)
+            chat_wait = self._chat_wait(message.chat_id, now)
+            if chat_wait > 0:
+                heapq.heappush(self.delayed, (now + chat_wait, message))
+                continue
+            self.bucket.take(now)
+            self.chat_buckets[message.chat_id].take(now)
+            self.latencies.append(now - message.submitted)
+            task = asyncio.create_task(self._deliver(message))
+            self._sending.add(task)
+            task.add_done_callback(self._delivered)
+
+    def _delivered(self, task: asyncio.Task) -> None:
+        self._sending.discard(task)
+        if not (self.ready or self.delayed or self._sending):
+            self._idle.set()
+
+    async def _deliver(self, message: OutMessage) -> None:
+        message.attempts += 1
+        try:
+            status, body = await self.post(message.data)
+        except (aiohttp.ClientError, TimeoutError) as exc:
+            status, body = None, {"description": str(exc)}
+        if status == 200:
+            self.sent += 1
+            self._resolve(message, body)
+            return
+        if status == 429:
+            self.rate_limited += 1
+        if status in (None, 429) and message.attempts <= self.retries:
+            retry_after = body.get("parameters", {}).get(
+                "retry_after", RETRY_DELAY
+            )
+            # the chat waits too, its next messages mustn't overtake this one
+            until = self.clock() + retry_after
+            self.chat_held[message.chat_id] = until
+            self.retried += 1
+            heapq.heappush(self.delayed, (until, message))
+            self._wakeup.set()
+            return
+        self.dropped += 1
+        logger.error("tg error %s: %s", status, body.get("description"))
+        self._resolve(message, None)
+
+    @staticmethod
+    def _resolve(message: OutMessage, result: dict | None) -> None:
+        if not message.future.done():  # the sender may be cancelled
+            message.future.set_result(result)
+
+    async def stop(self, grace: float = 10) -> None:
+        """Send what's queued for up to `grace` s, drop the rest"""
+        with suppress(TimeoutError):
+            await asyncio.wait_for(self._idle.wait(), grace)
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for message in self.ready + [m for _, m in self.delayed]:
+            self.dropped += 1
+            self._resolve(message, None)
+        self.ready, self.delayed = [], []
+        if not self._sending:
+            self._idle.set()
+
+    async def log_stats_forever(
+        self, interval: float = TG_STATS_INTERVAL
+    ) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            stats_logger.info("sender %s", self.stats())
+
+    def stats(self) -> dict:
+        """Counters and queue latency (submit -> request) of recent sends"""
+        latencies = sorted(self.latencies)
+        if len(latencies) > 1:
+            quantiles = statistics.quantiles(latencies, n=20)
+            p50, p95 = quantiles[9], quantiles[18]
+        else:
+            p50 = p95 = latencies[0] if latencies else 0.0
+        return {
+            "ready": len(self.ready),
+            "delayed": len(self.delayed),
+            "in_flight": len(self._sending),
+            "sent": self.sent,
+            "rate_limited": self.rate_limited,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "latency_ms": {
+                "p50": round(p50 * 1000, 3),
+                "p95": round(p95 * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+        }
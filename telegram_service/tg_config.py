@@ -9,6 +9,47 @@ logging.basicConfig(
     datefmt="%H:%M:%S",
 )
 logger = logging.getLogger(__name__)
+# queue and latency stats, printed under the WARNING level of the rest
+stats_logger = logging.getLogger(__name__ + ".stats")
+stats_logger.setLevel(logging.INFO)
 
 
 URL_START = os.environ.get("URL_START")
+
+# grade clicks in the bot with signed callback data (see callback_token)
+CALLBACK_SIGN_KEY = os.environ.get("KEY", "")
+LOCAL_GRADING = os.environ.get("TG_LOCAL_GRADING", "False") == "True" and bool(
+    CALLBACK_SIGN_KEY
+)
+
+# shared aiohttp client (see http_client), timeouts in seconds
+http_settings = {
+    "limit": int(os.environ.get("TG_HTTP_LIMIT", "100")),
+    "limit_per_host": int(os.environ.get("TG_HTTP_LIMIT_PER_HOST", "30")),
+    "keepalive": float(os.environ.get("TG_HTTP_KEEPALIVE", "60")),
+    "dns_cache": int(os.environ.get("TG_HTTP_DNS_CACHE", "300")),
+    "timeout": float(os.environ.get("TG_HTTP_TIMEOUT", "15")),
+    "connect_timeout": float(os.environ.get("TG_HTTP_CONNECT_TIMEOUT", "5")),
+}
+POLL_TIMEOUT = 30  # of getUpdates long polling
+
+# updates are handled by TG_WORKERS workers, a chat always by the same one
+TG_WORKERS = int(os.environ.get("TG_WORKERS", "16"))
+TG_WORKER_QUEUE = int(os.environ.get("TG_WORKER_QUEUE", "100"))
+TG_STATS_INTERVAL = float(os.environ.get("TG_STATS_INTERVAL", "60"))
+
+# the polled offset is saved to the service every N updates or T seconds
+TG_OFFSET_SAVE_EVERY = int(os.environ.get("TG_OFFSET_SAVE_EVERY", "100"))
+TG_OFFSET_SAVE_INTERVAL = float(os.environ.get("TG_OFFSET_SAVE_INTERVAL", "5"))
+POLL_RETRY_DELAY = 1  # after a failed poll
+
+# webhook mode (python tg_main.py --webhook), see telegram_service/webhook
+TG_WEBHOOK_URL = os.environ.get("TG_WEBHOOK_URL", "")  # public https url
+TG_WEBHOOK_SECRET = os.environ.get("TG_WEBHOOK_SECRET", "")
+TG_WEBHOOK_PORT = int(os.environ.get("TG_WEBHOOK_PORT", "8443"))
+
+# outgoing messages (see sender): a second globally and per chat
+TG_SEND_RATE = float(os.environ.get("TG_SEND_RATE", "30"))
+TG_CHAT_RATE = float(os.environ.get("TG_CHAT_RATE", "1"))
+TG_CHAT_BURST = float(os.environ.get("TG_CHAT_BURST", "3"))
+TG_SEND_RETRIES = int(os.environ.get("TG_SEND_RETRIES", "3"))
@@ -0,0 +1,117 @@
+"""Webhook ingestion: Telegram POSTs updates instead of being polled.
+
+Updates go to the same Dispatcher and TgWorkQueue as in polling mode,
+the response is sent as soon as the update is queued.
+"""
+
+import hmac
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+
+from fastapi import (
+    APIRouter,
+    Body,
+    FastAPI,
+    Header,
+    HTTPException,
+    Request,
+    status,
+)
+
+from telegram_service import TgWorkQueue
+from telegram_service.dispatcher import Dispatcher
+from telegram_service.http_client import http_client
+from telegram_service.tg_config import (
+    TG_WEBHOOK_SECRET,
+    TG_WEBHOOK_URL,
+    logger,
+)
+
+WEBHOOK_PATH = "/tg.webhook"
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"  # carries TG_WEBHOOK_SECRET
+
+api_router = APIRouter(
+    prefix="",
+    tags=["private"],
+)
+
+
+def secret_ok(secret: str | None) -> bool:
+    if not TG_WEBHOOK_SECRET or secret is None:
+        return False
+    return hmac.compare_digest(secret, TG_WEBHOOK_SECRET)
+
+
+@api_router.post(
+    WEBHOOK_PATH,
+    responses={
+        status.HTTP_403_FORBIDDEN: {"description": "Wrong secret token"},
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Queue of the chat is full, Telegram retries"
+        },
+    },
+)
+async def receive_update(
+    request: Request,
+    update: dict = Body(...),
+    x_telegram_bot_api_secret_token: str | None = Header(default=None),
+):
+    """Queue a Telegram update for the workers"""
+    if not secret_ok(x_telegram_bot_api_secret_token):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Forbidden")
+    if not request.app.state.dispatcher.try_dispatch(update):
+        raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Busy")
+    return {"ok": True}
+
+
+@api_router.get(
+    WEBHOOK_PATH + "/stats",
+    responses={status.HTTP_403_FORBIDDEN: {"description": "Wrong secret"}},
+)
+async def show_dispatcher_stats(
+    request: Request,
+    x_telegram_bot_api_secret_token: str | None = Header(default=None),
+):
+    """Queues and counters of the dispatcher and of the sender"""
+    if not secret_ok(x_telegram_bot_api_secret_token):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Forbidden")
+    return {
+        "dispatcher": request.app.state.dispatcher.stats(),
+        "sender": request.app.state.sender.stats(),
+    }
+
+
+async def set_webhook(url: str) -> None:
+    """Point Telegram at `url`, updates are no longer polled"""
+    tg_url = f"https://api.telegram.org/bot{TgWorkQueue.token}/setWebhook"
+    data = {"url": url, "secret_token": TG_WEBHOOK_SECRET}
+    async with http_client.session.post(tg_url, data=data) as resp:
+        if resp.status != 200:
+            logger.error("webhook not set: %s", await resp.text())
+
+
+def create_app(
+    handle: Callable[[dict], Awaitable[None]] | None = None,
+) -> FastAPI:
+    """Webhook app, `handle` is TgWorkQueue().process by default"""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await http_client.start()
+        wq = TgWorkQueue()
+        dispatcher = Dispatcher(handle or wq.process)
+        dispatcher.start()
+        app.state.dispatcher = dispatcher
+        app.state.sender = wq.sender
+        if not TG_WEBHOOK_SECRET:
+            logger.warning("TG_WEBHOOK_SECRET is not set, updates refused")
+        if TG_WEBHOOK_URL:
+            await set_webhook(TG_WEBHOOK_URL + WEBHOOK_PATH)
+        yield
+        await dispatcher.stop()
+        await wq.stop()
+        await http_client.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(api_router)
+    return app
@@ -16,7 +16,8 @@ from service.db_setup.db_settings import DBManager, get_session
 
 @pytest_asyncio.fixture(name="db", scope="function")
 async def get_test_session() -> AsyncGenerator[sessionmaker, None]:
-    async with DBManager().session_maker() as session:
+    db_manager = DBManager()
+    async with db_manager.session_maker() as session:
         try:
             yield session
             await session.commit()
@@ -25,6 +26,7 @@ async def get_test_session() -> AsyncGenerator[sessionmaker, None]:
             raise e
         finally:
             await session.close()
+            await db_manager.dispose()
 
 
 @pytest.fixture(name="client", scope="session")
@@ -0,0 +1,81 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from service.answer_key import AnswerKeyIndex, answer_keys, build_keys
+from service.catalog_listener import on_question_changed
+from service.db_setup.db_settings import REPLICA_SESSION
+from service.db_watchers import QUESTION_CHANGED_CHANNEL
+from service.schemas import AnswersSubmitRequest
+from service.utils import QuestionsManager
+
+ROWS = [(1, 10, "ten"), (1, 11, "eleven"), (2, 20, "twenty")]
+
+
+def test_build_and_grade():
+    keys = build_keys(ROWS)
+    assert keys[1].correct == frozenset({10, 11})
+    assert keys[2].texts == ((20, "twenty"),)
+
+    assert keys[1].grade([11, 10])
+    assert not keys[1].grade([10])
+    assert not keys[1].grade([10, 10])
+    assert not keys[1].grade([10, 11, 12])
+    assert not keys[2].grade([])
+
+
+def test_index_hits_and_misses():
+    index = AnswerKeyIndex()
+    index.load(build_keys(ROWS), index.generation())
+    assert index.get(1) is not None
+    assert index.get(3) is None
+    assert index.stats() == {
+        "size": 2,
+        "loaded": True,
+        "hits": 1,
+        "misses": 1,
+    }
+
+
+def test_invalidated_after_commit_and_notify():
+    answer_keys.load(build_keys(ROWS), answer_keys.generation())
+    session = Session()
+    answer_keys.invalidate_on_commit(session, 1)
+    # a concurrent read
+    answer_keys.put(1, build_keys(ROWS)[1], answer_keys.generation())
+    session.commit()
+    assert 1 not in answer_keys.keys
+
+    on_question_changed(None, 1, QUESTION_CHANGED_CHANNEL, "2")
+    assert 2 not in answer_keys.keys
+
+
+def test_read_before_invalidation_not_kept():
+    index = AnswerKeyIndex()
+    since = index.generation()
+    index.invalidate(1)  # committed while the key was read
+    index.put(1, build_keys(ROWS)[1], since)
+    index.load(build_keys(ROWS), since)
+    assert index.get(1) is None
+    assert index.get(2) is not None
+
+    session = Session()
+    session.info[REPLICA_SESSION] = True
+    index.put(1, build_keys(ROWS)[1], index.generation(), session)
+    assert index.get(1) is None
+
+
+@pytest.mark.asyncio
+async def test_grade_answers_from_loaded_keys():
+    answer_keys.load(build_keys(ROWS), answer_keys.generation())
+    data = AnswersSubmitRequest(
+        answers=[
+            {"question_id": 1, "answer_ids": [10, 11]},
+            {"question_id": 2, "answer_ids": [21]},
+            {"question_id": 2, "answer_ids": []},
+        ]
+    )
+    # every key is in the index, the db isn't touched
+    res = await QuestionsManager(None).grade_answers(data)
+    assert (res.total, res.correct) == (3, 1)
+    assert [r.correct for r in res.results] == [True, False, None]
+    assert [a.id for a in res.results[1].answers] == [20]
@@ -0,0 +1,26 @@
+from service.answered import ANSWERED_CHUNK_BITS, AnsweredBitmap, locate
+
+
+def test_locate():
+    assert locate(5) == (0, 5)
+    assert locate(ANSWERED_CHUNK_BITS + 3) == (1, 3)
+
+
+def test_bitmap_add_contains():
+    answered = AnsweredBitmap()
+    ids = (1, 8, 9, ANSWERED_CHUNK_BITS - 1, 3 * ANSWERED_CHUNK_BITS + 17)
+    for id_ in ids:
+        answered.add(id_)
+
+    assert all(id_ in answered for id_ in ids)
+    assert 2 not in answered
+    assert 2 * ANSWERED_CHUNK_BITS not in answered
+    assert len(answered) == len(ids)
+    assert sorted(answered.chunks) == [0, 3]
+
+
+def test_bits_like_postgres_get_bit():
+    # set_bit('\\x00', 1, 1) in postgres is '\\x02'
+    answered = AnsweredBitmap({0: b"\x02" + bytes(3)})
+    assert 1 in answered
+    assert 0 not in answered
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+from service.schemas import AnswerInResponse, QuestionInQuizResponse
+from telegram_service import TgWorkQueue, process
+from telegram_service.callback_token import (
+    CALLBACK_DATA_MAX,
+    read_choice,
+    sign_choice,
+)
+from telegram_service.process import CallHandlersQuizGame
+from telegram_service.schemas_tg import MessageInCallbackDto
+
+CHAT_ID = 10**12
+BIG_ID = 2**31 - 1
+
+
+def test_signed_choice_round_trip():
+    token = sign_choice(CHAT_ID, BIG_ID, BIG_ID, 2, [2])
+    assert len(token.encode()) <= CALLBACK_DATA_MAX
+
+    choice = read_choice(CHAT_ID, token)
+    assert choice.question_id == BIG_ID
+    assert choice.answer_id == BIG_ID
+    assert choice.correct
+
+    wrong = read_choice(CHAT_ID, sign_choice(CHAT_ID, 1, 5, 1, [2, 3]))
+    assert not wrong.correct
+    assert wrong.correct_options == (2, 3)
+
+
+def test_forged_choice_is_rejected():
+    token = sign_choice(CHAT_ID, 1, 5, 1, [2])
+    forged = token.replace(":1:2:", ":1:1:")
+    assert read_choice(CHAT_ID, forged) is None
+    assert read_choice(CHAT_ID + 1, token) is None
+    assert read_choice(CHAT_ID, '{"question_id": 1, "choice": 5}') is None
+
+
+@pytest.mark.asyncio
+async def test_buttons_carry_tokens(monkeypatch):
+    monkeypatch.setattr(process, "LOCAL_GRADING", True)
+    question = QuestionInQuizResponse(
+        id=7,
+        text="question",
+        active=1,
+        answers=[
+            AnswerInResponse(id=70, text="no", correct=False),
+            AnswerInResponse(id=71, text="yes", correct=True),
+        ],
+    )
+    quiz_out = await CallHandlersQuizGame().transform_to_text_and_btns(
+        question, CHAT_ID
+    )
+    no, yes = (
+        read_choice(CHAT_ID, btn["callback_data"])
+        for btn in quiz_out.buttons[0]
+    )
+    assert (no.answer_id, no.correct) == (70, False)
+    assert (yes.answer_id, yes.correct) == (71, True)
+
+    quiz_out = await CallHandlersQuizGame().transform_to_text_and_btns(
+        question
+    )
+    assert json.loads(quiz_out.buttons[0][0]["callback_data"]) == {
+        "question_id": 7,
+        "choice": 70,
+    }
+
+
+@pytest.mark.asyncio
+async def test_reports_finished_on_stop(monkeypatch):
+    wq, reported = TgWorkQueue(), []
+
+    async def send_reply(chat_id, text):
+        pass
+
+    async def report_round(message, choice):
+        await asyncio.sleep(0.01)
+        reported.append(choice.question_id)
+
+    monkeypatch.setattr(wq, "send_reply", send_reply)
+    monkeypatch.setattr(wq, "report_round", report_round)
+    token = sign_choice(CHAT_ID, 7, 71, 2, (2,))
+    message = MessageInCallbackDto(chat_id=CHAT_ID, callback_data=token)
+    await wq.grade_locally(message, read_choice(CHAT_ID, token))
+    assert wq.reports
+
+    await wq.stop()
+    assert reported == [7]
+    assert not wq.reports
@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import Session
+
+from service.catalog import QuestionCatalog, catalog
+from service.catalog_listener import on_question_changed
+from service.db_setup.db_settings import REPLICA_SESSION
+from service.db_setup.schemas import AnswerDto, QuestionDto
+from service.db_watchers import QUESTION_CHANGED_CHANNEL
+
+
+def make_question(id_: int, active: int = 1) -> QuestionDto:
+    return QuestionDto(
+        id=id_,
+        text=f"question {id_}",
+        active=active,
+        answers=[AnswerDto(id=id_, text="a", correct=True, question_id=id_)],
+        updated_dt=datetime.now(tz=timezone.utc),
+    )
+
+
+def test_lru_eviction_and_counters():
+    lru = QuestionCatalog(max_size=2)
+    for id_ in (1, 2):
+        lru.put(make_question(id_), lru.generation())
+    assert lru.get(1).id == 1
+    # 2 is the least recently used
+    lru.put(make_question(3), lru.generation())
+
+    assert lru.get(2) is None
+    assert lru.get(3).id == 3
+    assert lru.stats() | {"hit_ratio": None} == {
+        "size": 2,
+        "max_size": 2,
+        "hits": 2,
+        "misses": 1,
+        "hit_ratio": None,
+        "evictions": 1,
+        "invalidations": 0,
+    }
+
+
+def test_inactive_not_cached():
+    lru = QuestionCatalog(max_size=2)
+    lru.put(make_question(1, active=0), lru.generation())
+    assert lru.get(1) is None
+
+
+def test_invalidated_again_after_commit():
+    session = Session()
+    catalog.put(make_question(10), catalog.generation())
+    catalog.invalidate_on_commit(session, 10)
+    assert catalog.get(10) is None
+
+    catalog.put(make_question(10), catalog.generation())  # concurrent read
+    session.commit()
+    assert catalog.get(10) is None
+
+
+def test_read_started_before_invalidation_not_put():
+    lru = QuestionCatalog(max_size=2)
+    since = lru.generation()
+    lru.invalidate(12)  # committed while the read ran
+    lru.put(make_question(12), since)
+    assert lru.get(12) is None
+
+    since = lru.generation()
+    lru.clear()
+    lru.put(make_question(12), since)
+    assert lru.get(12) is None
+
+    lru.put(make_question(12), lru.generation())
+    assert lru.get(12).id == 12
+
+
+def test_replica_reads_not_put():
+    lru = QuestionCatalog(max_size=2)
+    session = Session()
+    session.info[REPLICA_SESSION] = True
+    lru.put(make_question(13), lru.generation(), session)
+    assert lru.get(13) is None
+
+
+def test_notify_payload_invalidates():
+    catalog.put(make_question(11), catalog.generation())
+    on_question_changed(None, 1, QUESTION_CHANGED_CHANNEL, "11")
+    assert catalog.get(11) is None
+
+    on_question_changed(None, 1, QUESTION_CHANGED_CHANNEL, "not an id")
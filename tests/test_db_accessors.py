@@ -1,13 +1,22 @@
 import asyncio
 import logging
+from datetime import datetime, timezone
 
 import pytest
 import pytest_asyncio
+import sqlalchemy as sa
 from fastapi import Depends
 from pydantic import BaseModel
 
-from service.db_setup.models import Answer, Base, Question, User
-from service.db_watchers import AnswerDb, QuestionDb
+from service.db_setup.models import (
+    Answer,
+    Base,
+    Question,
+    Rounds,
+    Schedule,
+    User,
+)
+from service.db_watchers import AnswerDb, GameDb, QuestionDb, search_tsquery
 from service.schemas import QuestionListRequest
 from service.utils import QuestionsManager
 
@@ -54,3 +63,127 @@ async def test_db_get_question(db):
     print(list_ids)
     print("-------")
     logger.info(questions)
+
+
+@pytest.mark.asyncio
+async def test_db_rounds_unique_per_question(db):
+    tg_id = 100505
+    game = GameDb(db)
+    await game.create_player(tg_id)
+    for _ in range(3):
+        await game.create_new_rounds(tg_id)
+
+    result = await db.execute(
+        sa.select(Rounds.question_id).where(Rounds.player_id == tg_id)
+    )
+    question_ids = result.scalars().all()
+    assert len(question_ids) == len(set(question_ids))
+
+    await db.execute(
+        sa.update(Rounds).where(Rounds.player_id == tg_id).values(asked=True)
+    )
+    assert await game.prune_asked_rounds(chunk=1) <= 1
+    assert await game.delete_old_rounds(tg_id) >= len(question_ids) - 1
+
+
+@pytest.mark.asyncio
+async def test_db_refill_decks(db):
+    tg_ids = (100506, 100507)
+    game = GameDb(db)
+    for tg_id in tg_ids:
+        await game.create_player(tg_id)
+
+    await game.refill_decks(list(tg_ids), low=3, size=4)
+    await game.refill_decks(list(tg_ids), low=3, size=4)  # decks are full
+
+    for tg_id in tg_ids:
+        result = await db.execute(
+            sa.select(sa.func.count()).where(
+                Rounds.player_id == tg_id, Rounds.asked.is_(False)
+            )
+        )
+        assert result.scalar() <= 4
+
+
+@pytest.mark.asyncio
+async def test_db_refill_decks_after_reset(db):
+    tg_id = 100509
+    game = GameDb(db)
+    await game.create_player(tg_id)
+    question_id = await QuestionDb(db).add_question(
+        {"text": "due question", "active": 1}
+    )
+    # the only active question: both due and, after the reset, unseen
+    await db.execute(
+        sa.update(Question).where(Question.id != question_id).values(active=0)
+    )
+    await db.execute(
+        sa.insert(Schedule).values(
+            player_id=tg_id,
+            question_id=question_id,
+            due=datetime(2000, 1, 1, tzinfo=timezone.utc),
+        )
+    )
+    await game.mark_question_answered(question_id, tg_id)
+    await game.reset_answered(tg_id)
+
+    assert await game.refill_decks([tg_id], low=3, size=4) == 1
+    await db.rollback()  # the other questions stay active
+
+
+@pytest.mark.asyncio
+async def test_db_deactivated_question_not_due(db):
+    tg_id = 100510
+    game = GameDb(db)
+    await game.create_player(tg_id)
+    question_id = await QuestionDb(db).add_question(
+        {"text": "retired question", "active": 1}
+    )
+    await db.execute(
+        sa.insert(Schedule).values(
+            player_id=tg_id,
+            question_id=question_id,
+            due=datetime(2000, 1, 1, tzinfo=timezone.utc),
+        )
+    )
+    await db.execute(
+        sa.update(Question).where(Question.id == question_id).values(active=0)
+    )
+
+    due = await db.execute(game.due_questions_query(tg_id, 10))
+    assert question_id not in due.scalars().all()
+    await game.refill_decks([tg_id], low=3, size=4)
+    await game.create_new_rounds(tg_id, review_ahead=True)
+    result = await db.execute(
+        sa.select(Rounds.question_id).where(Rounds.player_id == tg_id)
+    )
+    assert question_id not in result.scalars().all()
+    await db.rollback()
+
+
+@pytest.mark.asyncio
+async def test_db_answered_bitmap(db):
+    tg_id = 100508
+    game = GameDb(db)
+    await game.create_player(tg_id)
+    question_id = await QuestionDb(db).add_question(
+        {"text": "bitmap question", "active": 1}
+    )
+
+    await game.mark_question_answered(question_id, tg_id)
+    await game.mark_question_answered(question_id + 1, tg_id)
+    answered = await game.get_answered(tg_id)
+    assert question_id in answered
+    assert question_id - 1 not in answered
+
+    assert await game.reset_answered(tg_id)
+    assert question_id not in await game.get_answered(tg_id)
+    assert await game.has_unanswered(tg_id)
+
+
+def test_search_tsquery():
+    assert search_tsquery("The lion ___ its Prey") == (
+        "the:* & lion:* & its:* & prey:*"
+    )
+    assert search_tsquery("Лев, добыча!") == "лев:* & добыча:*"
+    assert search_tsquery("___") is None
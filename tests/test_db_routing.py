@@ -0,0 +1,56 @@
+import time
+
+import pytest
+import sqlalchemy as sa
+
+from service.config import db_settings
+from service.db_setup.db_settings import DBManager
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(name="replicated")
+def fixture_replicated(monkeypatch):
+    monkeypatch.setitem(
+        db_settings, "replicas", ["localhost:5434", "localhost:5435"]
+    )
+    return DBManager()
+
+
+async def test_read_engine_round_robin(replicated):
+    replicated.get_engine()
+    for engine in replicated.replicas:
+        replicated._replica_lag[engine] = (time.monotonic(), 0.0)
+
+    picked = [await replicated.read_engine() for _ in range(4)]
+    assert picked == replicated.replicas * 2
+    assert replicated.engine not in picked
+    await replicated.dispose()
+
+
+async def test_lagging_replica_is_skipped(replicated):
+    replicated.get_engine()
+    lagging, fresh = replicated.replicas
+    now = time.monotonic()
+    replicated._replica_lag[lagging] = (now, 100.0)
+    replicated._replica_lag[fresh] = (now, 0.5)
+
+    assert {await replicated.read_engine() for _ in range(3)} == {fresh}
+
+    replicated._replica_lag[fresh] = (now, float("inf"))
+    assert await replicated.read_engine() is replicated.engine
+    await replicated.dispose()
+
+
+@pytest.mark.skipif(
+    not db_settings["replicas"], reason="needs DB_REPLICAS (local postgres)"
+)
+async def test_read_session_goes_to_replica():
+    db_manager = DBManager()
+    db_manager.get_engine()
+    engine = await db_manager.read_engine()
+    assert engine is not db_manager.engine
+    async with db_manager.session_maker_for(engine)() as session:
+        port = await session.execute(sa.text("SELECT inet_server_port()"))
+        assert port.scalar() == engine.url.port
+    await db_manager.dispose()
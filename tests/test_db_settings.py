@@ -0,0 +1,17 @@
+import pytest
+
+from service.db_setup.db_settings import db_manager, get_session
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_engine_is_shared_between_sessions(client):
+    engine = db_manager.engine
+    assert engine is not None
+
+    sessions = [get_session(), get_session()]
+    binds = [(await anext(gen)).bind for gen in sessions]
+    for gen in sessions:
+        await gen.aclose()
+    assert binds == [engine, engine]
+    assert db_manager.engine is engine
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from service.deck_builder import DeckBuilder
+
+pytestmark = pytest.mark.asyncio
+
+
+class RecordingDeckBuilder(DeckBuilder):
+    """Two rounds per player, fails while `down` is set"""
+
+    def __init__(self, batch: int):
+        super().__init__(batch=batch)
+        self.batches = []
+        self.down = False
+
+    async def refill(self, tg_ids: list[int]) -> int:
+        if self.down:
+            raise OperationalError("INSERT", {}, ConnectionError())
+        self.batches.append(sorted(tg_ids))
+        return 2 * len(tg_ids)
+
+
+async def test_refill_in_batches():
+    builder = RecordingDeckBuilder(batch=2)
+    for tg_id in (1, 2, 3, 2):
+        builder.touch(tg_id)
+
+    assert await builder.run_once() == 6
+    assert sorted(sum(builder.batches, [])) == [1, 2, 3]
+    assert [len(batch) for batch in builder.batches] == [2, 1]
+    assert builder.stats()["players_checked"] == 3
+    assert builder.stats()["waiting_players"] == 0
+
+
+async def test_players_kept_when_db_is_down():
+    builder = RecordingDeckBuilder(batch=10)
+    builder.touch(5)
+    builder.down = True
+    with pytest.raises(OperationalError):
+        await builder.run_once()
+    assert builder.stats()["waiting_players"] == 1
+
+    builder.down = False
+    assert await builder.run_once() == 2
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from telegram_service.dispatcher import Dispatcher, chat_id_of
+
+pytestmark = pytest.mark.asyncio
+
+
+def update(chat_id: int, n: int) -> dict:
+    return {"update_id": n, "message": {"chat": {"id": chat_id}, "text": n}}
+
+
+async def test_chat_order_kept_chats_in_parallel():
+    handled = []
+
+    async def handle(upd):
+        if upd["update_id"] == 0:
+            await asyncio.sleep(0.05)  # a slow first update of chat 1
+        handled.append((chat_id_of(upd), upd["update_id"]))
+
+    dispatcher = Dispatcher(handle, workers=4, queue_size=10)
+    dispatcher.start()
+    for n, chat_id in enumerate([1, 2, 1, 2, 1]):
+        await dispatcher.dispatch(update(chat_id, n))
+    await dispatcher.stop()
+
+    assert [n for chat, n in handled if chat == 1] == [0, 2, 4]
+    # chat 2 didn't wait for the slow update of chat 1
+    assert handled[:2] == [(2, 1), (2, 3)]
+    assert dispatcher.stats()["processed"] == 5
+
+
+async def test_full_queue_blocks_dispatch():
+    release = asyncio.Event()
+
+    async def handle(upd):
+        await release.wait()
+
+    dispatcher = Dispatcher(handle, workers=1, queue_size=1)
+    dispatcher.start()
+    await dispatcher.dispatch(update(1, 0))  # taken by the worker
+    await asyncio.sleep(0)
+    await dispatcher.dispatch(update(1, 1))  # fills the queue
+    blocked = asyncio.create_task(dispatcher.dispatch(update(1, 2)))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert dispatcher.stats()["depth"] == 1
+
+    release.set()
+    await blocked
+    await dispatcher.stop()
+    stats = dispatcher.stats()
+    assert (stats["blocked"], stats["processed"]) == (1, 3)
+
+
+async def test_errors_are_counted():
+    async def handle(upd):
+        raise ValueError(upd["update_id"])
+
+    dispatcher = Dispatcher(handle, workers=2, queue_size=2)
+    dispatcher.start()
+    await dispatcher.dispatch({"update_id": 7})
+    await dispatcher.stop()
+    assert dispatcher.stats()["errors"] == 1
+
+
+async def test_stats_are_logged_under_warning_level(caplog):
+    async def handle(upd):
+        pass
+
+    dispatcher = Dispatcher(handle)
+    task = asyncio.create_task(dispatcher.log_stats_forever(interval=0.01))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    assert any(
+        record.getMessage().startswith("dispatcher ")
+        for record in caplog.records
+    )
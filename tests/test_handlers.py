@@ -5,7 +5,9 @@ from urllib.parse import urlencode
 
 import pytest
 import pytest_asyncio
+import sqlalchemy as sa
 
+from service.db_setup.models import Rounds
 from service.schemas import IsCorrectAnsResponse
 
 pytest_plugins = ("pytest_asyncio",)
@@ -43,9 +45,9 @@ async def test_get_questions_handler(client):
     assert response.status_code == 200
 
 
-def add_question(client, url="/v1/add-question"):
+def add_question(client, url="/v1/add-question", text="question1"):
     input_data = {
-        "text": "question1",
+        "text": text,
         "active": 1,
     }
     response = client.post(url, json=input_data)
@@ -62,11 +64,80 @@ def add_answer(client, q_id, url="/v1/add-answer"):
     return id_
 
 
+async def test_search_questions_handler(client):
+    q_id = add_question(client, text="Лев может поглотить свою добычу")
+    other_id = add_question(client, text="Лев может")
+
+    input_data = {"text": "поглот добыч", "order": "relevance"}
+    response = client.post("/v1/questions", json=input_data)
+    assert response.status_code == 200
+    found = [question["id"] for question in response.json()]
+    assert q_id in found
+    assert other_id not in found
+
+
+async def test_questions_cursor_pages(client):
+    ids = [add_question(client) for _ in range(3)]
+    input_data = {"active": 1, "limit": 2, "order": "updated_dt"}
+
+    response = client.post("/v1/questions", json=input_data)
+    assert response.status_code == 200
+    first_page = [question["id"] for question in response.json()]
+    assert first_page == ids[::-1][:2]
+
+    input_data["cursor"] = response.headers["X-Next-Cursor"]
+    response = client.post("/v1/questions", json=input_data)
+    assert response.status_code == 200
+    assert response.json()[0]["id"] == ids[0]
+
+    input_data["cursor"] = "broken"
+    response = client.post("/v1/questions", json=input_data)
+    assert response.status_code == 400
+
+    input_data = {"active": 1, "limit": None, "order": "id"}
+    response = client.post("/v1/questions", json=input_data)
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+
+
 async def test_add_question_handler(client):
     q_id = add_question(client, "/v1/add-question")
     assert q_id
 
 
+async def test_add_questions_bulk_handler(client):
+    answers = [
+        {"text": "right", "correct": True},
+        {"text": "wrong", "correct": False},
+    ]
+    input_data = {
+        "questions": [
+            {"text": "bulk question1", "answers": answers},
+            {"text": "", "answers": answers},
+            {"text": "bulk question3", "answers": answers[1:]},
+            {"text": "bulk question4", "active": 0},
+        ]
+    }
+    response = client.post("/v1/questions:bulk", json=input_data)
+    assert response.status_code == 201
+    res = response.json()
+    assert res["created"] == 2
+    first, empty, no_correct, no_answers = res["items"]
+    assert first["id"] and len(first["answer_ids"]) == 2
+    assert empty["id"] is None and empty["error"]
+    assert no_correct["error"] == "answers: no correct answer"
+    assert no_answers["id"] and no_answers["answer_ids"] == []
+
+    response = client.get(f"/v1/show-quiz?question_id={first['id']}")
+    assert response.status_code == 200
+    assert {
+        a["text"] for a in response.json()[str(first["id"])]["answers"]
+    } == {
+        "right",
+        "wrong",
+    }
+
+
 @pytest.mark.skip()
 async def test_edit_question_handler(client):
     url = "/v1/edit-question"
@@ -101,7 +172,110 @@ async def test_submit_answer_handler(client):
     assert res.correct
 
 
+async def test_submit_answers_handler(client):
+    q_id = add_question(client, "/v1/add-question")
+    id_ = add_answer(client, q_id, "/v1/add-answer")
+
+    input_data = {
+        "answers": [
+            {"question_id": q_id, "answer_ids": [id_]},
+            {"question_id": q_id, "answer_ids": [id_, id_]},
+            {"question_id": -1, "answer_ids": [1]},
+        ]
+    }
+    response = client.post("/v1/submit-answers", json=input_data)
+    assert response.status_code == 200
+    res = response.json()
+    assert res["total"] == 3
+    assert res["correct"] == 1
+    assert [r["correct"] for r in res["results"]] == [True, False, None]
+
+    response = client.post("/v1/submit-answers", json={"answers": []})
+    assert response.status_code == 422
+
+
+async def test_answer_keys_loaded_after_startup(client):
+    # the LISTEN connection of the app doesn't drop the loaded keys
+    await asyncio.sleep(0.5)
+    stats = client.get("/v1/stats/answer-keys").json()
+    assert stats["loaded"]
+
+
 async def test_delete_answer_handler(client):
     url = "/v1/delete-answer?id=1"
     response = client.delete(url)
     assert response.status_code == 200
+
+
+async def test_next_round_handler(client):
+    tg_id = 100501
+    response = client.post(f"/v1/add-player?tg_id={tg_id}")
+    assert response.status_code == 200
+    q_id = add_question(client)
+    add_answer(client, q_id)
+
+    response = client.post("/v1/next-round", json={"tg_id": tg_id})
+    assert response.status_code == 200
+    question = response.json()
+    assert question["id"] and question["text"]
+    assert "answers" in question
+
+    response = client.post("/v1/next-round", json={"tg_id": -1})
+    assert response.status_code == 400
+
+
+async def test_answer_round_handler(client, db):
+    tg_id = 100502
+    client.post(f"/v1/add-player?tg_id={tg_id}")
+    score = client.get(f"/v1/player-score?tg_id={tg_id}").json()["score"]
+    q_id = add_question(client)
+    ans_id = add_answer(client, q_id)
+
+    # no open round of the question: graded, not scored
+    input_data = {"tg_id": tg_id, "question_id": q_id, "answer_ids": [ans_id]}
+    response = client.post("/v1/answer-round", json=input_data)
+    assert response.status_code == 200
+    res = response.json()
+    assert res["correct"] is True
+    assert res["score"] == score
+
+    await db.execute(
+        sa.insert(Rounds).values(player_id=tg_id, question_id=q_id)
+    )
+    await db.commit()
+    res = client.post("/v1/answer-round", json=input_data).json()
+    assert res["score"] == score + 1
+    assert res["next_question"] is None or res["next_question"]["id"]
+
+    # the round is closed, a repeated answer isn't scored again
+    again = client.post("/v1/answer-round", json=input_data).json()
+    assert again["score"] == score + 1
+
+    response = client.get(f"/v1/player-score?tg_id={tg_id}")
+    assert response.json()["score"] == score + 1
+
+
+async def test_leaderboard_handlers(client):
+    tg_ids = (100503, 100504)
+    for tg_id in tg_ids:
+        client.post(f"/v1/add-player?tg_id={tg_id}")
+    client.put(f"/v1/edit-score?tg_id={tg_ids[0]}")
+
+    response = client.get("/v1/leaderboard/top?limit=5")
+    assert response.status_code == 200
+    players = response.json()["players"]
+    assert [p["rank"] for p in players] == sorted(p["rank"] for p in players)
+
+    response = client.get(f"/v1/leaderboard/rank?tg_id={tg_ids[0]}")
+    assert response.status_code == 200
+    first = response.json()
+    response = client.get(f"/v1/leaderboard/rank?tg_id={tg_ids[1]}")
+    assert response.json()["rank"] > first["rank"]
+
+    response = client.get(f"/v1/leaderboard/around?tg_id={tg_ids[0]}")
+    assert response.status_code == 200
+    around = [p["tg_id"] for p in response.json()["players"]]
+    assert tg_ids[0] in around
+
+    response = client.get("/v1/leaderboard/rank?tg_id=-1")
+    assert response.status_code == 404
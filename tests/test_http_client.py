@@ -0,0 +1,19 @@
+import pytest
+
+from telegram_service.http_client import HttpClient
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_one_session_until_closed():
+    client = HttpClient()
+    async with client:
+        session = client.session
+        assert client.session is session
+        assert session.connector.limit_per_host > 0
+    assert session.closed
+
+    reopened = client.session  # lazily, for scripts
+    assert reopened is not session
+    await client.close()
+    assert reopened.closed
@@ -0,0 +1,61 @@
+import random
+
+from sqlalchemy.orm import Session
+
+from service.leaderboard import Leaderboard, ScoreTree, leaderboard
+
+
+def brute_rank(scores: list[int], score: int) -> int:
+    return 1 + sum(s > score for s in scores)
+
+
+def test_score_tree_rank():
+    scores = [random.randrange(3000) for _ in range(500)]
+    counts = {}
+    for score in scores:
+        counts[score] = counts.get(score, 0) + 1
+    tree = ScoreTree.from_counts(counts)
+
+    assert tree.total == len(scores)
+    for score in (0, 1, 17, 1024, 2999, 5000, *scores[:50]):
+        assert tree.rank(score) == brute_rank(scores, score)
+
+
+def test_score_tree_grows():
+    tree = ScoreTree(size=4)
+    tree.add(0)
+    tree.add(3)
+    tree.add(100)
+
+    assert len(tree.counts) == 128
+    assert tree.total == 3
+    assert tree.rank(100) == 1
+    assert tree.rank(3) == 2
+    assert tree.rank(0) == 3
+
+
+def test_leaderboard_score_raised():
+    board = Leaderboard()
+    assert board.rank(0) is None
+    board.score_raised(1)  # not loaded, ignored
+
+    board.load({0: 2, 5: 1})
+    board.score_raised(1)  # one of the zeros
+    assert board.players == 3
+    assert board.rank(5) == 1
+    assert board.rank(1) == 2
+    assert board.rank(0) == 3
+
+
+def test_raise_applied_after_commit():
+    leaderboard.load({0: 2})
+    session = Session()
+    leaderboard.score_raised_on_commit(session, 1)
+    assert leaderboard.rank(1) == 1  # not committed yet, no one has 1
+    assert leaderboard.rank(0) == 1
+    session.commit()
+    assert leaderboard.rank(0) == 2
+
+    leaderboard.score_raised_on_commit(session, 1)
+    session.rollback()
+    assert leaderboard.rank(0) == 2
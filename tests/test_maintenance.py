@@ -0,0 +1,42 @@
+import pytest
+
+from service.maintenance import RoundsPruner
+
+pytestmark = pytest.mark.asyncio
+
+
+class ChunkedPruner(RoundsPruner):
+    """Pretends there are `asked` rounds to delete"""
+
+    def __init__(self, asked: int, chunk: int):
+        super().__init__(chunk)
+        self.asked = asked
+        self.statements = 0
+
+    async def prune_chunk(self) -> int:
+        self.statements += 1
+        deleted = min(self.asked, self.chunk)
+        self.asked -= deleted
+        return deleted
+
+    async def read_table_size(self) -> None:
+        self.table_size = {"rows_estimate": 7, "total_bytes": 8192}
+
+
+async def test_prune_in_chunks():
+    pruner = ChunkedPruner(asked=25, chunk=10)
+    assert await pruner.run_once(pause=0) == 25
+    assert pruner.statements == 3
+
+    assert await pruner.run_once(pause=0) == 0
+    stats = pruner.stats()
+    assert stats["pruned_total"] == 25
+    assert stats["runs"] == 2
+    assert stats["last_pruned"] == 0
+    assert stats["rows_estimate"] == 7
+
+
+async def test_rounds_stats_handler(client):
+    response = client.get("/v1/stats/rounds")
+    assert response.status_code == 200
+    assert "pruned_total" in response.json()
@@ -0,0 +1,43 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from service.db_setup.schemas import QuestionDto
+from service.errors import InvalidCursorError
+from service.pagination import decode_cursor, encode_cursor, next_cursor
+
+question = QuestionDto(
+    id=7,
+    text="question",
+    active=1,
+    answers=[],
+    updated_dt=datetime(2024, 9, 10, 8, 19, 54, 531503, tzinfo=timezone.utc),
+)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("id", question), "id") == {"id": 7}
+    cursor = encode_cursor("updated_dt", question)
+    assert decode_cursor(cursor, "updated_dt") == {
+        "id": 7,
+        "dt": question.updated_dt,
+    }
+
+
+@pytest.mark.parametrize(
+    ("cursor", "order"),
+    [
+        ("not a cursor", "id"),
+        (encode_cursor("id", question), "updated_dt"),
+        (encode_cursor("id", question), "relevance"),
+    ],
+)
+def test_invalid_cursor(cursor, order):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, order)
+
+
+def test_no_cursor_after_last_page():
+    assert next_cursor("id", [question], last_page=True) is None
+    assert next_cursor("relevance", [question], last_page=False) is None
+    assert next_cursor("id", [question], last_page=False)
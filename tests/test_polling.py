@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from telegram_service import TgPullQueue
+from telegram_service.http_client import http_client
+from telegram_service.process import CallHandlersTg
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(name="service_offset")
+def fixture_service_offset(monkeypatch):
+    calls = {"get": 0, "saved": []}
+
+    async def get_last_tg_id(self):
+        calls["get"] += 1
+        return 41
+
+    async def update_tg_id(self, upd_id):
+        calls["saved"].append(upd_id)
+        return {"success": True}
+
+    monkeypatch.setattr(CallHandlersTg, "get_last_tg_id", get_last_tg_id)
+    monkeypatch.setattr(CallHandlersTg, "update_tg_id", update_tg_id)
+    return calls
+
+
+def fake_updates(tg: TgPullQueue, batches: list[list[int]], asked: list):
+    async def get_tg_updates(method_name="getUpdates"):
+        asked.append(tg.offset)
+        return [{"update_id": id_} for id_ in batches.pop(0)]
+
+    tg.get_tg_updates = get_tg_updates
+
+
+async def test_offset_kept_in_memory(service_offset, monkeypatch):
+    monkeypatch.setattr("telegram_service.TG_OFFSET_SAVE_EVERY", 3)
+    tg, asked = TgPullQueue(), []
+    fake_updates(tg, [[42, 43], [], [44], [45]], asked)
+
+    assert len(await tg.get_new_messages()) == 2
+    assert await tg.get_new_messages() == []
+    await tg.get_new_messages()
+    await asyncio.sleep(0)  # the save runs in the background
+    assert service_offset["saved"] == [44]
+    await tg.get_new_messages()
+
+    assert asked == [42, 44, 44, 45]
+    assert service_offset["get"] == 1
+    assert (tg.offset, tg.unsaved) == (46, 1)
+
+    await tg.save_offset()  # on shutdown
+    assert service_offset["saved"] == [44, 45]
+    await tg.save_offset()
+    assert service_offset["saved"] == [44, 45]
+
+
+class FakeResponse:
+    def __init__(self, body: dict):
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.body
+
+
+async def test_not_ok_is_logged_and_backed_off(monkeypatch, caplog):
+    conflict = {
+        "ok": False,
+        "error_code": 409,
+        "description": "Conflict: can't use getUpdates while webhook is set",
+    }
+
+    class FakeSession:
+        closed = False
+
+        def post(self, *args, **kwargs):
+            return FakeResponse(conflict)
+
+    monkeypatch.setattr(http_client, "_session", FakeSession())
+    monkeypatch.setattr("telegram_service.POLL_RETRY_DELAY", 0.05)
+
+    started = time.monotonic()
+    assert await TgPullQueue().get_tg_updates() == []
+    assert time.monotonic() - started >= 0.05
+    assert "409: Conflict" in caplog.text
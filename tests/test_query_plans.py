@@ -0,0 +1,214 @@
+"""EXPLAIN every hot db_watchers query on a big seeded db.
+
+Seeds 1M rounds inside a transaction which is rolled back at the end.
+Slow, so it runs only with QUERY_PLAN_TESTS=1 (after `make renew`).
+"""
+
+import os
+
+import pytest
+import pytest_asyncio
+import sqlalchemy as sa
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from service.db_setup.db_settings import DBManager
+from service.db_watchers import AnswerDb, GameDb, QuestionDb
+from service.schemas import QuestionListRequest
+
+pytestmark = [
+    pytest.mark.skipif(
+        not os.environ.get("QUERY_PLAN_TESTS"),
+        reason="set QUERY_PLAN_TESTS=1 to seed 1M rounds and check plans",
+    ),
+    pytest.mark.asyncio(loop_scope="module"),
+]
+
+PLAYERS = 10_000
+QUESTIONS = 100_000
+ROUNDS = 1_000_000
+TG_BASE = 10**12
+BIG_TABLES = {"questions", "answers", "players", "rounds"}
+# prefix tsquery, its row estimate comes from the sampled text_tsv stats
+SAMPLED_SELECTIVITY = {"search_questions"}
+
+SEED = (
+    """INSERT INTO players (tg_id, score)
+    SELECT :tg_base + g, g % 1000 FROM generate_series(1, :players) g""",
+    """INSERT INTO questions (text, active)
+    SELECT 'plan question ' || g, (g % 10 <> 0)::int
+    FROM generate_series(1, :questions) g""",
+    """INSERT INTO answers (text, correct, question_id)
+    SELECT 'answer ' || a, a = 1, q.id
+    FROM questions q, generate_series(1, 4) a
+    WHERE q.text LIKE 'plan question %'""",
+    # unique (player, question) pairs
+    """INSERT INTO rounds (player_id, question_id, asked)
+    SELECT :tg_base + 1 + g % :players,
+        q.min_id + ((g / :players) * 1000 + g % 1000) % :questions,
+        g % 3 = 0
+    FROM generate_series(0, :rounds - 1) g,
+        (SELECT min(id) AS min_id FROM questions
+        WHERE text LIKE 'plan question %') q""",
+    "ANALYZE players, questions, answers, rounds",
+)
+
+
+@pytest_asyncio.fixture(name="seeded", scope="module", loop_scope="module")
+async def fixture_seeded():
+    db_manager = DBManager()
+    engine = db_manager.get_engine()
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        params = {
+            "tg_base": TG_BASE,
+            "players": PLAYERS,
+            "questions": QUESTIONS,
+            "rounds": ROUNDS,
+        }
+        for statement in SEED:
+            await conn.execute(
+                sa.text(statement).bindparams(
+                    **{k: v for k, v in params.items() if f":{k}" in statement}
+                )
+            )
+        question_id = (
+            await conn.execute(
+                sa.text(
+                    "SELECT min(id) FROM questions "
+                    "WHERE text LIKE 'plan question %'"
+                )
+            )
+        ).scalar()
+        session = AsyncSession(
+            bind=conn, join_transaction_mode="create_savepoint"
+        )
+        try:
+            yield session, conn, question_id
+        finally:
+            await session.close()
+            await trans.rollback()
+    await db_manager.dispose()
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def explain_calls(conn, call) -> list[str]:
+    """Run an accessor call, EXPLAIN each statement it sent."""
+    captured = []
+
+    def capture(_conn, _cursor, statement, parameters, *args):
+        if not statement.startswith(("SAVEPOINT", "RELEASE SAVEPOINT")):
+            captured.append((statement, parameters))
+
+    sync_conn = conn.sync_connection
+    event.listen(sync_conn, "before_cursor_execute", capture)
+    try:
+        await call()
+    finally:
+        event.remove(sync_conn, "before_cursor_execute", capture)
+
+    scans = []
+    for statement, parameters in captured:
+        result = await conn.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + statement, parameters
+        )
+        plan = result.scalar()[0]["Plan"]
+        scans.extend(t for t in seq_scans(plan) if t in BIG_TABLES)
+    assert captured
+    return scans
+
+
+PLAYER = TG_BASE + 1
+
+
+def accessor_calls(session, question_id: int) -> dict:
+    game, questions = GameDb(session), QuestionDb(session)
+    return {
+        "get_next_question_id": lambda: game.get_next_question_id(PLAYER),
+        "get_next_question": lambda: game.get_next_question(PLAYER),
+        "mark_question_answered": lambda: game.mark_question_answered(
+            question_id, PLAYER
+        ),
+        "delete_old_rounds": lambda: game.delete_old_rounds(PLAYER),
+        "raise_score": lambda: game.raise_score(PLAYER),
+        "get_score_of_player": lambda: game.get_score_of_player(PLAYER),
+        "top_players": lambda: game.top_players(10),
+        "players_around": lambda: game.players_around(PLAYER, 500, 5),
+        "create_new_rounds": lambda: game.create_new_rounds(PLAYER),
+        "refill_decks": lambda: game.refill_decks(
+            [PLAYER + i for i in range(100)], low=3, size=10
+        ),
+        "find_correct_answers": lambda: questions.find_correct_answers(
+            question_id
+        ),
+        "get_question_by_id": lambda: questions.get_question_by_id(
+            question_id
+        ),
+        "get_questions_by_id": lambda: questions.get_questions(
+            QuestionListRequest(order="id")
+        ),
+        "get_questions_by_updated_dt": lambda: questions.get_questions(
+            QuestionListRequest(order="updated_dt")
+        ),
+        "search_questions": lambda: questions.get_questions(
+            QuestionListRequest(text="99999", order="relevance")
+        ),
+        "get_questions_with_answers": (
+            lambda: questions.get_questions_with_answers(
+                QuestionListRequest(question_id=question_id)
+            )
+        ),
+        "correct_answer_rows": lambda: AnswerDb(session).correct_answer_rows(
+            [question_id, question_id + 1]
+        ),
+        "get_answers_for_question": lambda: AnswerDb(
+            session
+        ).get_answers_for_question(question_id),
+    }
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "get_next_question_id",
+        "get_next_question",
+        "mark_question_answered",
+        "delete_old_rounds",
+        "raise_score",
+        "get_score_of_player",
+        "top_players",
+        "players_around",
+        "create_new_rounds",
+        "refill_decks",
+        "find_correct_answers",
+        "get_question_by_id",
+        "get_questions_by_id",
+        "get_questions_by_updated_dt",
+        "search_questions",
+        "get_questions_with_answers",
+        "correct_answer_rows",
+        "get_answers_for_question",
+    ],
+)
+async def test_no_seq_scan(seeded, name):
+    session, conn, question_id = seeded
+    call = accessor_calls(session, question_id)[name]
+    if name not in SAMPLED_SELECTIVITY:
+        scans = await explain_calls(conn, call)
+    else:
+        # the index must be usable, whether it's picked depends on
+        # ANALYZE sampling: seq scans are only taken without another way
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        try:
+            scans = await explain_calls(conn, call)
+        finally:
+            await conn.exec_driver_sql("RESET enable_seqscan")
+    assert not scans, f"sequential scan on {scans}"
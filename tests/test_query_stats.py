@@ -0,0 +1,72 @@
+import logging
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.exc import OperationalError
+
+from service.db_setup.query_stats import (
+    QueryStats,
+    current_accessor,
+    label_accessor_methods,
+    normalize_sql,
+)
+
+
+def test_normalize_sql_groups_by_shape():
+    first = normalize_sql(
+        "SELECT rounds.question_id FROM rounds\n"
+        "WHERE rounds.player_id = $1::BIGINT AND rounds.asked = false"
+    )
+    second = normalize_sql(
+        "SELECT rounds.question_id FROM rounds "
+        "WHERE rounds.player_id = 42 AND rounds.asked = false"
+    )
+    assert first == second
+    assert (
+        normalize_sql(
+            "SELECT * FROM answers "
+            "WHERE question_id IN ($1::INTEGER, $2::INTEGER)"
+        )
+        == "SELECT * FROM answers WHERE question_id IN (...)"
+    )
+
+
+@pytest.mark.asyncio
+async def test_record_by_accessor_and_log_slow(caplog):
+    class FakeDb:
+        async def get_one(self):
+            stats.record("SELECT 1", 5)
+            stats.record("SELECT 2", 50)
+
+    stats = QueryStats(enabled=True, slow_ms=10)
+    label_accessor_methods(FakeDb)
+    with caplog.at_level(logging.WARNING):
+        await FakeDb().get_one()
+
+    assert current_accessor.get() is None
+    snapshot = stats.snapshot()
+    assert snapshot["statements"][0]["count"] == 2
+    assert snapshot["statements"][0]["key"] == "SELECT ?"
+    assert snapshot["accessors"][0]["key"] == "FakeDb.get_one"
+    assert snapshot["accessors"][0]["max_ms"] == 50
+    slow = [r for r in caplog.records if "slow query" in r.getMessage()]
+    assert len(slow) == 1
+    assert "FakeDb.get_one" in slow[0].getMessage()
+
+
+def test_failed_statement_drops_its_start():
+    stats = QueryStats(enabled=True)
+    engine = sa.create_engine("sqlite://")
+    stats.attach(engine)
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(sa.text("SELECT * FROM missing"))
+        assert conn.info["query_start"] == []
+        conn.execute(sa.text("SELECT 1"))
+    assert stats.snapshot()["statements"][0]["key"] == "SELECT ?"
+
+
+def test_query_stats_handler(client):
+    response = client.get("/v1/stats/queries")
+    assert response.status_code == 200
+    assert "statements" in response.json()
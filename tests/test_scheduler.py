@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+
+from service.db_setup.schemas import ScheduleDto
+from service.scheduler import (
+    FIRST_INTERVALS_S,
+    MAX_INTERVAL_S,
+    MIN_EASE,
+    RETRY_INTERVAL_S,
+    next_review,
+)
+
+NOW = datetime(2024, 9, 10, 8, 0, tzinfo=timezone.utc)
+
+
+def test_intervals_grow_while_correct():
+    schedule = ScheduleDto(player_id=1, question_id=2, due=NOW)
+    intervals = []
+    for _ in range(4):
+        schedule = next_review(schedule, correct=True, now=NOW)
+        intervals.append(schedule.interval_s)
+
+    assert intervals[:2] == list(FIRST_INTERVALS_S)
+    assert intervals[2] == int(FIRST_INTERVALS_S[1] * 2.7)
+    assert intervals[3] > intervals[2]
+    assert schedule.streak == 4
+    assert schedule.due == NOW + timedelta(seconds=intervals[3])
+
+
+def test_long_streak_is_capped():
+    schedule = ScheduleDto(player_id=1, question_id=2, due=NOW)
+    for _ in range(50):
+        schedule = next_review(schedule, correct=True, now=NOW)
+
+    assert schedule.interval_s == MAX_INTERVAL_S
+    assert schedule.interval_s < 2**31
+    assert schedule.due == NOW + timedelta(seconds=MAX_INTERVAL_S)
+
+
+def test_wrong_answer_resets_streak():
+    schedule = ScheduleDto(
+        player_id=1, question_id=2, due=NOW, ease=1.4, streak=3
+    )
+    schedule = next_review(schedule, correct=False, now=NOW)
+
+    assert schedule.streak == 0
+    assert schedule.ease == MIN_EASE
+    assert schedule.due == NOW + timedelta(seconds=RETRY_INTERVAL_S)
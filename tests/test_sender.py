@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+
+from telegram_service import sender as sender_module
+from telegram_service.sender import (
+    BROADCAST,
+    GAME,
+    SendScheduler,
+    TokenBucket,
+)
+
+OK = (200, {"ok": True})
+
+
+class FakeTelegram:
+    """Answers `responses` in turn, then 200"""
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.posted = []
+
+    async def post(self, data):
+        self.posted.append((time.monotonic(), data))
+        await asyncio.sleep(0)
+        response = self.responses.pop(0) if self.responses else OK
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2, capacity=2, now=0)
+    bucket.take(0)
+    bucket.take(0)
+    assert bucket.delay(0) == 0.5
+    assert bucket.delay(0.5) == 0
+    assert not bucket.full(0.5)
+    assert bucket.full(10)
+    assert bucket.tokens == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_is_paced_others_are_not():
+    tg = FakeTelegram()
+    sender = SendScheduler(tg.post, rate=1000, chat_rate=20, chat_burst=1)
+    await asyncio.gather(
+        *(sender.send({"chat_id": 1, "text": n}) for n in range(3)),
+        sender.send({"chat_id": 2, "text": "other"}),
+    )
+    chat_1 = [
+        (at, data["text"]) for at, data in tg.posted if data["chat_id"] == 1
+    ]
+    assert [text for _, text in chat_1] == [0, 1, 2]
+    assert chat_1[2][0] - chat_1[0][0] >= 0.09
+    # chat 2 didn't wait behind chat 1
+    assert tg.posted[1][1]["chat_id"] == 2
+    await sender.stop()
+
+
+@pytest.mark.asyncio
+async def test_game_replies_before_broadcasts():
+    tg = FakeTelegram()
+    sender = SendScheduler(tg.post, rate=1000)
+    futures = [
+        sender.submit({"chat_id": n, "text": "news"}, BROADCAST)
+        for n in range(3)
+    ]
+    futures.append(sender.submit({"chat_id": 9, "text": "reply"}, GAME))
+    await asyncio.gather(*futures)
+    assert tg.posted[0][1]["text"] == "reply"
+    await sender.stop()
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured():
+    too_many = (429, {"ok": False, "parameters": {"retry_after": 0.05}})
+    tg = FakeTelegram([too_many])
+    sender = SendScheduler(tg.post, rate=1000, retries=1)
+    assert await sender.send({"chat_id": 1, "text": "hi"}) == {"ok": True}
+    assert tg.posted[1][0] - tg.posted[0][0] >= 0.05
+
+    tg.responses = [too_many, too_many]
+    assert await sender.send({"chat_id": 2, "text": "hi"}) is None
+    stats = sender.stats()
+    assert (stats["sent"], stats["rate_limited"], stats["dropped"]) == (
+        1,
+        3,
+        1,
+    )
+    assert stats["latency_ms"]["max"] >= 50
+    await sender.stop()
+
+
+@pytest.mark.asyncio
+async def test_network_error_retry_keeps_chat_order(monkeypatch):
+    monkeypatch.setattr(sender_module, "RETRY_DELAY", 0.05)
+    tg = FakeTelegram([aiohttp.ClientError("reset")])
+    sender = SendScheduler(tg.post, rate=1000, chat_rate=1000, retries=1)
+    first = sender.submit({"chat_id": 1, "text": "first"})
+    await asyncio.sleep(0.01)
+    second = sender.submit({"chat_id": 1, "text": "second"})
+    await asyncio.gather(first, second)
+    assert [data["text"] for _, data in tg.posted] == [
+        "first",
+        "first",
+        "second",
+    ]
+    assert sender.stats()["retried"] == 1
+    await sender.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_queued_then_drops():
+    tg = FakeTelegram()
+    sender = SendScheduler(tg.post, rate=1000, chat_rate=20, chat_burst=1)
+    await sender.stop()  # idle, returns right away
+
+    futures = [sender.submit({"chat_id": 1, "text": n}) for n in range(3)]
+    await sender.stop(grace=1)
+    assert [future.result() for future in futures] == [{"ok": True}] * 3
+
+    futures = [sender.submit({"chat_id": 1, "text": n}) for n in range(3)]
+    await sender.stop(grace=0.01)
+    assert futures[-1].result() is None
+    assert sender.stats()["dropped"] >= 1
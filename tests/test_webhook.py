@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from telegram_service import webhook
+from telegram_service.dispatcher import chat_id_of
+from telegram_service.fake_updates import sample_updates
+from telegram_service.webhook import SECRET_HEADER
+
+SECRET = "test-secret"
+
+
+@pytest.fixture(name="handled")
+def fixture_handled(monkeypatch):
+    monkeypatch.setattr(webhook, "TG_WEBHOOK_SECRET", SECRET)
+    return []
+
+
+def test_updates_are_queued_in_chat_order(handled):
+    async def handle(update):
+        await asyncio.sleep(0)
+        handled.append((chat_id_of(update), update["update_id"]))
+
+    updates = sample_updates(chats=20, amount=500)
+    with TestClient(webhook.create_app(handle)) as client:
+        for update in updates:
+            response = client.post(
+                webhook.WEBHOOK_PATH,
+                json=update,
+                headers={SECRET_HEADER: SECRET},
+            )
+            assert response.status_code == 200
+        stats = client.get(
+            webhook.WEBHOOK_PATH + "/stats", headers={SECRET_HEADER: SECRET}
+        ).json()
+        assert stats["dispatcher"]["dispatched"] == 500
+    # the lifespan drained the queues on exit
+    assert len(handled) == 500
+    chat = chat_id_of(updates[0])
+    ids = [id_ for chat_id, id_ in handled if chat_id == chat]
+    assert ids == sorted(ids)
+
+
+def test_wrong_secret_is_refused(handled):
+    async def handle(update):
+        handled.append(update)
+
+    with TestClient(webhook.create_app(handle)) as client:
+        update = sample_updates(chats=1, amount=1)[0]
+        for headers in ({}, {SECRET_HEADER: "other"}):
+            response = client.post(
+                webhook.WEBHOOK_PATH, json=update, headers=headers
+            )
+            assert response.status_code == 403
+            response = client.get(
+                webhook.WEBHOOK_PATH + "/stats", headers=headers
+            )
+            assert response.status_code == 403
+    assert handled == []
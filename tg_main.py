@@ -1,23 +1,66 @@
+import argparse
 import asyncio
 
+import aiohttp
+import uvicorn
+
 from telegram_service import TgPullQueue, TgWorkQueue
+from telegram_service.dispatcher import Dispatcher
+from telegram_service.http_client import http_client
+from telegram_service.tg_config import (
+    POLL_RETRY_DELAY,
+    TG_WEBHOOK_PORT,
+    logger,
+)
+from telegram_service.webhook import create_app
 
 
 async def telegram_main(tg: TgPullQueue, wq: TgWorkQueue):
-    while True:
-        for message in await tg.get_new_messages():
-            await wq.process(message)
-        await asyncio.sleep(5)
+    async with http_client:
+        dispatcher = Dispatcher(wq.process)
+        dispatcher.start()
+        tasks = [
+            asyncio.create_task(dispatcher.log_stats_forever()),
+            asyncio.create_task(wq.sender.log_stats_forever()),
+            asyncio.create_task(tg.save_offset_forever()),
+        ]
+        try:
+            while True:
+                try:
+                    messages = await tg.get_new_messages()
+                except (aiohttp.ClientError, TimeoutError) as exc:
+                    logger.warning("polling failed: %s", exc)
+                    await asyncio.sleep(POLL_RETRY_DELAY)
+                    continue
+                # the next long poll goes right away
+                for message in messages:
+                    await dispatcher.dispatch(message)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await dispatcher.stop()
+            await wq.stop()
+            await tg.save_offset()
 
 
 if __name__ == "__main__":
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        print("started...")
-        tg = TgPullQueue()
-        wq = TgWorkQueue()
-        asyncio.run(telegram_main(tg, wq))
-    except KeyboardInterrupt:
-        print("wait...")
-        pass
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--webhook",
+        action="store_true",
+        help="receive updates on TG_WEBHOOK_PORT instead of polling",
+    )
+    args = parser.parse_args()
+    if args.webhook:
+        uvicorn.run(create_app(), host="0.0.0.0", port=TG_WEBHOOK_PORT)
+    else:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            print("started...")
+            tg = TgPullQueue()
+            wq = TgWorkQueue()
+            asyncio.run(telegram_main(tg, wq))
+        except KeyboardInterrupt:
+            print("wait...")
+            pass